@@ -0,0 +1,613 @@
+import json
+from enum import IntEnum
+
+# Bump whenever the layout written by CompiledTBox.save changes
+FORMAT_VERSION = 2
+
+
+class ConceptKind(IntEnum):
+    """
+    The kinds of concepts the EL rules distinguish between.
+    OTHER covers concepts outside of EL (e.g. a disjunction nested in a filler),
+    which the rules treat as atoms without any told subsumers.
+    """
+    NAME = 0
+    TOP = 1
+    CONJUNCTION = 2
+    EXISTENTIAL = 3
+    OTHER = 4
+
+
+class Concept:
+    __slots__ = ("id", "kind", "children", "role", "label")
+
+    def __init__(self, id, kind, children=(), role=-1, label=None):
+        """
+        Initialize an interned concept record.
+
+        :param id: Integer ID of the concept in its CompiledTBox
+        :param kind: ConceptKind of the concept
+        :param children: IDs of the conjuncts, or a 1-tuple with the filler of an existential
+        :param role: Role ID of an existential, -1 otherwise
+        :param label: Name of a concept name (or formatted string of an OTHER concept)
+        """
+        self.id = id
+        self.kind = kind
+        self.children = children
+        self.role = role
+        self.label = label
+
+    def __repr__(self):
+        return (f"Concept(id={self.id}, kind={self.kind.name}, "
+                f"children={self.children}, role={self.role}, label={self.label})")
+
+
+class CompiledTBox:
+    def __init__(self):
+        """
+        Initialize an empty compiled TBox. Concepts and roles are interned, so every
+        structurally equal concept gets the same integer ID and the rules can compare
+        plain integers instead of asking the JVM.
+        """
+        self.concepts = []  # Concept ID -> Concept
+        self.roles = []  # Role ID -> role name
+        self.axioms = []  # GCIs as (lhs ID, rhs ID)
+        self.told_subsumers = {}  # lhs ID -> [rhs ID] over all GCIs
+        self.conjunctions_with = {}  # Conjunct ID -> [IDs of the conjunctions containing it]
+        self.existentials_with = {}  # Filler ID -> {role ID: ID of ∃role.filler}
+        self.names = []  # IDs of the concept names, in ontology order
+        self._keys = {}  # Structural key -> concept ID
+        self._role_ids = {}  # Role name -> role ID
+        self._name_ids = {}  # Concept name -> concept ID
+        self._module_index = None  # Built by extract_module on first use
+        self._relevance_index = None  # Built by relevant_for on first use
+        self._hierarchy = None  # Built by told_name_hierarchy on first use
+
+        self.top = self._intern(("T",), ConceptKind.TOP, label="⊤")
+
+    def _intern(self, key, kind, children=(), role=-1, label=None):
+        concept_id = self._keys.get(key)
+        if concept_id is None:
+            concept_id = len(self.concepts)
+            self.concepts.append(Concept(concept_id, kind, children, role, label))
+            self._keys[key] = concept_id
+        return concept_id
+
+    def intern_role(self, name):
+        """
+        Return the ID of a role, adding it if it is new.
+
+        :param name: Name of the role
+        :return: Role ID
+        """
+        role_id = self._role_ids.get(name)
+        if role_id is None:
+            role_id = len(self.roles)
+            self.roles.append(name)
+            self._role_ids[name] = role_id
+        return role_id
+
+    def intern_name(self, name):
+        """
+        Return the ID of a concept name, adding it if it is new.
+
+        :param name: Name of the concept
+        :return: Concept ID
+        """
+        concept_id = self._name_ids.get(name)
+        if concept_id is None:
+            concept_id = self._intern(("N", name), ConceptKind.NAME, label=name)
+            self._name_ids[name] = concept_id
+            self.names.append(concept_id)
+        return concept_id
+
+    def intern_conjunction(self, *conjuncts):
+        """
+        Return the ID of the conjunction over the given concept IDs.
+        Conjunctions are keyed by their set of conjuncts, so A ⊓ B and B ⊓ A are the same concept.
+
+        :param conjuncts: IDs of the conjuncts
+        :return: Concept ID
+        """
+        children = tuple(sorted(set(conjuncts)))
+        if len(children) == 1:
+            # A ⊓ A is just A
+            return children[0]
+        known = len(self.concepts)
+        concept_id = self._intern(("C",) + children, ConceptKind.CONJUNCTION, children=children)
+        if concept_id >= known:
+            for conjunct in children:
+                self.conjunctions_with.setdefault(conjunct, []).append(concept_id)
+        return concept_id
+
+    def intern_existential(self, role, filler):
+        """
+        Return the ID of the existential role restriction ∃role.filler.
+
+        :param role: Role ID
+        :param filler: Concept ID of the filler
+        :return: Concept ID
+        """
+        concept_id = self._intern(("E", role, filler), ConceptKind.EXISTENTIAL, children=(filler,), role=role)
+        self.existentials_with.setdefault(filler, {})[role] = concept_id
+        return concept_id
+
+    def intern_other(self, label):
+        """
+        Return the ID of a concept outside of EL, identified by its formatted string.
+
+        :param label: Formatted string of the concept
+        :return: Concept ID
+        """
+        return self._intern(("O", label), ConceptKind.OTHER, label=label)
+
+    def add_gci(self, lhs, rhs):
+        """
+        Add the GCI lhs ⊑ rhs and index it by its left-hand side.
+
+        :param lhs: Concept ID of the subsumee
+        :param rhs: Concept ID of the subsumer
+        """
+        self.axioms.append((lhs, rhs))
+        self._module_index = None
+        self._relevance_index = None
+        self._hierarchy = None
+        subsumers = self.told_subsumers.setdefault(lhs, [])
+        if rhs not in subsumers:
+            subsumers.append(rhs)
+
+    def remove_gci(self, lhs, rhs):
+        """
+        Remove one occurrence of the GCI lhs ⊑ rhs. The concepts it mentions stay interned.
+
+        :param lhs: Concept ID of the subsumee
+        :param rhs: Concept ID of the subsumer
+        :return: True if rhs is no longer a told subsumer of lhs
+        """
+        if (lhs, rhs) not in self.axioms:
+            return False
+        self.axioms.remove((lhs, rhs))
+        self._module_index = None
+        self._relevance_index = None
+        self._hierarchy = None
+        if (lhs, rhs) in self.axioms:
+            return False
+
+        subsumers = self.told_subsumers[lhs]
+        subsumers.remove(rhs)
+        if not subsumers:
+            del self.told_subsumers[lhs]
+        return True
+
+    def lookup_conjunction(self, *conjuncts):
+        """
+        Find the conjunction over the given concept IDs without adding it.
+
+        :return: Concept ID, or None if the conjunction does not occur in the TBox
+        """
+        children = tuple(sorted(set(conjuncts)))
+        if len(children) == 1:
+            return children[0]
+        return self._keys.get(("C",) + children)
+
+    def lookup_existential(self, role, filler):
+        """
+        Find ∃role.filler without adding it.
+
+        :return: Concept ID, or None if the restriction does not occur in the TBox
+        """
+        return self.existentials_with.get(filler, {}).get(role)
+
+    def lookup_other(self, label):
+        """
+        Find a concept outside of EL by its formatted string without adding it.
+
+        :return: Concept ID, or None if the concept does not occur in the TBox
+        """
+        return self._keys.get(("O", label))
+
+    def name_id(self, name):
+        """
+        Find a concept name by its name.
+
+        :return: Concept ID, or None if the name does not occur in the TBox
+        """
+        return self._name_ids.get(name)
+
+    def role_id(self, name):
+        """
+        Find a role by its name.
+
+        :return: Role ID, or None if the role does not occur in the TBox
+        """
+        return self._role_ids.get(name)
+
+    def signature(self, concept_id, cache=None):
+        """
+        Return the symbols a concept is built from. Concept names (and OTHER atoms) are
+        represented by their concept ID, roles by -(role ID + 1).
+
+        :param concept_id: ID of the concept
+        :param cache: Optional dictionary to memoize signatures of sub-concepts in
+        :return: Frozenset of symbols
+        """
+        if cache is not None and concept_id in cache:
+            return cache[concept_id]
+
+        concept = self.concepts[concept_id]
+        if concept.kind == ConceptKind.TOP:
+            symbols = frozenset()
+        elif concept.kind == ConceptKind.CONJUNCTION:
+            symbols = frozenset().union(*[self.signature(c, cache) for c in concept.children])
+        elif concept.kind == ConceptKind.EXISTENTIAL:
+            symbols = self.signature(concept.children[0], cache) | {-(concept.role + 1)}
+        else:
+            symbols = frozenset([concept_id])
+
+        if cache is not None:
+            cache[concept_id] = symbols
+        return symbols
+
+    def extract_module(self, concept_ids):
+        """
+        Extract the reachability-based module for the given concepts: starting from their
+        symbols, a GCI is added once every symbol of its left-hand side has been reached,
+        and then the symbols of its right-hand side become reachable too. All other GCIs
+        have a left-hand side that can be empty without contradicting anything, so they
+        can not contribute to the subsumers of the given concepts.
+
+        :param concept_ids: IDs of the concepts to be queried
+        :return: New CompiledTBox holding only the module; concept IDs differ from this TBox,
+                 concept names keep their names and relative order
+        """
+        if self._module_index is None:
+            cache = {}
+            lhs_symbols = [self.signature(lhs, cache) for lhs, _ in self.axioms]
+            rhs_symbols = [self.signature(rhs, cache) for _, rhs in self.axioms]
+            axioms_by_symbol = {}
+            for index, symbols in enumerate(lhs_symbols):
+                for symbol in symbols:
+                    axioms_by_symbol.setdefault(symbol, []).append(index)
+            self._module_index = (lhs_symbols, rhs_symbols, axioms_by_symbol)
+        lhs_symbols, rhs_symbols, axioms_by_symbol = self._module_index
+
+        missing = [len(symbols) for symbols in lhs_symbols]
+        included = [False] * len(self.axioms)
+        reached = set()
+        pending = []
+
+        def reach(symbols):
+            for symbol in symbols:
+                if symbol not in reached:
+                    reached.add(symbol)
+                    pending.append(symbol)
+
+        for concept_id in concept_ids:
+            reach(self.signature(concept_id))
+        # GCIs like ⊤ ⊑ A apply to every element
+        for index, count in enumerate(missing):
+            if count == 0:
+                included[index] = True
+                reach(rhs_symbols[index])
+        while pending:
+            for index in axioms_by_symbol.get(pending.pop(), ()):
+                missing[index] -= 1
+                if missing[index] == 0:
+                    included[index] = True
+                    reach(rhs_symbols[index])
+
+        module = CompiledTBox()
+        for name in self.names:
+            if name in reached:
+                module.intern_name(self.concepts[name].label)
+        for concept_id in concept_ids:
+            module.copy_concept(self, concept_id)
+        for index, (lhs, rhs) in enumerate(self.axioms):
+            if included[index]:
+                module.add_gci(module.copy_concept(self, lhs), module.copy_concept(self, rhs))
+        return module
+
+    def relevant_for(self, goal):
+        """
+        Return the concepts that can contribute to deriving the goal concept in some element.
+        Working backwards over the rules: the left-hand sides of GCIs with a relevant
+        right-hand side, the conjuncts of relevant conjunctions and the conjunctions
+        containing a relevant conjunct, and for a relevant ∃r.C its filler C plus every
+        ∃r.D (an r-successor for D may bring C back) are relevant.
+        Saturating with only these concepts derives the goal if and only if the full
+        saturation does.
+
+        :param goal: ID of the concept to be derived
+        :return: Set of concept IDs, including the goal itself
+        """
+        if self._relevance_index is None or self._relevance_index[0] != len(self.concepts):
+            told_subsumees = {}
+            for lhs, rhs in self.axioms:
+                told_subsumees.setdefault(rhs, []).append(lhs)
+            existentials_by_role = {}
+            for concept in self.concepts:
+                if concept.kind == ConceptKind.EXISTENTIAL:
+                    existentials_by_role.setdefault(concept.role, []).append(concept.id)
+            self._relevance_index = (len(self.concepts), told_subsumees, existentials_by_role)
+        _, told_subsumees, existentials_by_role = self._relevance_index
+
+        relevant = {goal}
+        pending = [goal]
+        expanded_roles = set()
+
+        def mark(concept_id):
+            if concept_id not in relevant:
+                relevant.add(concept_id)
+                pending.append(concept_id)
+
+        while pending:
+            concept_id = pending.pop()
+            concept = self.concepts[concept_id]
+            for lhs in told_subsumees.get(concept_id, ()):
+                mark(lhs)
+            for conjunction in self.conjunctions_with.get(concept_id, ()):
+                mark(conjunction)
+            if concept.kind == ConceptKind.CONJUNCTION:
+                for conjunct in concept.children:
+                    mark(conjunct)
+            elif concept.kind == ConceptKind.EXISTENTIAL:
+                mark(concept.children[0])
+                if concept.role not in expanded_roles:
+                    expanded_roles.add(concept.role)
+                    for existential in existentials_by_role.get(concept.role, ()):
+                        mark(existential)
+        return relevant
+
+    def told_name_components(self):
+        """
+        Find the strongly connected components of the told subsumption graph between
+        concept names, i.e. the names that are equivalent because of GCIs A ⊑ B alone
+        (A ≡ B, or cycles like A ⊑ B ⊑ C ⊑ A). Uses an iterative version of Tarjan's algorithm.
+
+        :return: List of all components, each a list of concept IDs in ontology order.
+                 A component comes after every component its names have a told subsumer in.
+        """
+        successors = self._told_name_successors()
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        components = []
+
+        for start in self.names:
+            if start in index:
+                continue
+            index[start] = lowlink[start] = len(index)
+            stack.append(start)
+            on_stack.add(start)
+            work = [(start, iter(successors[start]))]
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(successors[child])))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component))
+        return components
+
+    def told_name_cycles(self):
+        """
+        Return the components of told_name_components with more than one name.
+        """
+        return [component for component in self.told_name_components() if len(component) > 1]
+
+    def told_name_hierarchy(self):
+        """
+        Compute the transitive closure of the told subsumptions between concept names,
+        bottom-up over the components of told_name_components, with a Python integer
+        per component as bitset.
+
+        A name is atomic if it and all names in its closure only have concept names as told
+        subsumers and occur in no conjunction, and no GCI has ⊤ as left-hand side. No other
+        rule can fire on the element of an atomic name, so its closure is exactly its set of
+        subsuming names. For every other name the closure is still a subset of its subsumers.
+
+        :return: Tuple of a dictionary from concept name ID to its closure as bitset
+                 (bit i stands for self.names[i]; the name itself is included), and the
+                 set of atomic concept name IDs
+        """
+        if self._hierarchy is not None:
+            return self._hierarchy
+
+        successors = self._told_name_successors()
+        bit = {name: 1 << index for index, name in enumerate(self.names)}
+        has_top_gcis = self.top in self.told_subsumers
+        closure = {}
+        atomic = set()
+        for component in self.told_name_components():
+            bits = 0
+            is_atomic = not has_top_gcis
+            for name in component:
+                bits |= bit[name]
+                if (name in self.conjunctions_with
+                        or len(successors[name]) != len(self.told_subsumers.get(name, ()))):
+                    is_atomic = False
+                for subsumer in successors[name]:
+                    if subsumer not in closure:
+                        continue  # Inside the component
+                    bits |= closure[subsumer]
+                    if subsumer not in atomic:
+                        is_atomic = False
+            for name in component:
+                closure[name] = bits
+            if is_atomic:
+                atomic.update(component)
+
+        self._hierarchy = (closure, atomic)
+        return self._hierarchy
+
+    def names_in(self, bits):
+        """
+        Decode a bitset of told_name_hierarchy.
+
+        :return: List of concept name IDs, in ontology order
+        """
+        names = []
+        while bits:
+            lowest = bits & -bits
+            names.append(self.names[lowest.bit_length() - 1])
+            bits ^= lowest
+        return names
+
+    def _told_name_successors(self):
+        return {name: [rhs for rhs in self.told_subsumers.get(name, ())
+                       if self.concepts[rhs].kind == ConceptKind.NAME]
+                for name in self.names}
+
+    def collapse_equivalent_names(self):
+        """
+        Replace every group of told-equivalent concept names (see told_name_cycles) by one
+        representative, the first of them in ontology order. The GCIs inside a group become
+        A ⊑ A and are dropped, so the rules no longer derive the same names over and over.
+        Equivalent names have the same subsumers, so the subsumers of every name follow
+        from the subsumers of its representative.
+
+        :return: Tuple of the collapsed CompiledTBox (this TBox itself if there is nothing
+                 to collapse) and a dictionary from every concept name ID of this TBox to
+                 the concept ID of its representative in the collapsed TBox
+        """
+        components = self.told_name_cycles()
+        if not components:
+            return self, {name: name for name in self.names}
+
+        renamed = {}
+        for component in components:
+            for member in component[1:]:
+                renamed[self.concepts[member].label] = self.concepts[component[0]].label
+
+        collapsed = CompiledTBox()
+        for name in self.names:
+            if self.concepts[name].label not in renamed:
+                collapsed.intern_name(self.concepts[name].label)
+        for lhs, rhs in self.axioms:
+            lhs = collapsed.copy_concept(self, lhs, renamed)
+            rhs = collapsed.copy_concept(self, rhs, renamed)
+            if lhs != rhs:
+                collapsed.add_gci(lhs, rhs)
+
+        representative = {name: collapsed.copy_concept(self, name, renamed) for name in self.names}
+        return collapsed, representative
+
+    def copy_concept(self, source, concept_id, renamed=None):
+        """
+        Intern a concept of another CompiledTBox into this one.
+
+        :param source: CompiledTBox the concept belongs to
+        :param concept_id: ID of the concept in source
+        :param renamed: Optional dictionary of concept names to replace by other names
+        :return: ID of the concept in this TBox
+        """
+        concept = source.concepts[concept_id]
+        if concept.kind == ConceptKind.NAME:
+            if renamed is not None:
+                return self.intern_name(renamed.get(concept.label, concept.label))
+            return self.intern_name(concept.label)
+        if concept.kind == ConceptKind.TOP:
+            return self.top
+        if concept.kind == ConceptKind.CONJUNCTION:
+            return self.intern_conjunction(*[self.copy_concept(source, c, renamed) for c in concept.children])
+        if concept.kind == ConceptKind.EXISTENTIAL:
+            return self.intern_existential(self.intern_role(source.roles[concept.role]),
+                                           self.copy_concept(source, concept.children[0], renamed))
+        return self.intern_other(concept.label)
+
+    def format(self, concept_id):
+        """
+        Format a concept in DL syntax, e.g. for debugging output.
+
+        :param concept_id: ID of the concept to format
+        :return: String representation of the concept
+        """
+        concept = self.concepts[concept_id]
+        if concept.kind == ConceptKind.CONJUNCTION:
+            return "(" + " ⊓ ".join(self.format(c) for c in concept.children) + ")"
+        if concept.kind == ConceptKind.EXISTENTIAL:
+            return f"(∃{self.roles[concept.role]}.{self.format(concept.children[0])})"
+        return concept.label
+
+    def save(self, file):
+        """
+        Write the compiled TBox to a binary file object as JSON.
+        Only plain lists of numbers and strings are written, so reading a file never runs
+        code from it; the lookup tables are rebuilt by load.
+
+        :param file: File object opened for binary writing
+        """
+        rows = [(int(c.kind), c.children, c.role, c.label) for c in self.concepts]
+        file.write(json.dumps((FORMAT_VERSION, rows, self.roles, self.axioms), separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def load(cls, file):
+        """
+        Read a compiled TBox written by save.
+
+        :param file: File object opened for binary reading
+        :return: The CompiledTBox, or None if the file was written in another format version
+        :raises ValueError: If the file is not JSON or its concepts are not consistent
+        :raises TypeError: If a row has values of the wrong type
+        :raises IndexError: If a row has too few children
+        """
+        data = json.load(file)
+        if not isinstance(data, list) or len(data) != 4 or data[0] != FORMAT_VERSION:
+            return None
+        _, rows, roles, axioms = data
+
+        compiled = cls()
+        for role in roles:
+            compiled.intern_role(str(role))
+        # Re-interning in ID order gives every concept its original ID back; a concept
+        # only refers to concepts and roles before it
+        for concept_id, (kind, children, role, label) in enumerate(rows):
+            if any(not 0 <= child < concept_id for child in children):
+                raise ValueError(f"Concept {concept_id} refers to a later concept")
+            if kind == ConceptKind.NAME:
+                interned = compiled.intern_name(str(label))
+            elif kind == ConceptKind.TOP:
+                interned = compiled.top
+            elif kind == ConceptKind.CONJUNCTION:
+                interned = compiled.intern_conjunction(*children)
+            elif kind == ConceptKind.EXISTENTIAL:
+                if not 0 <= role < len(compiled.roles):
+                    raise ValueError(f"Concept {concept_id} has an unknown role")
+                interned = compiled.intern_existential(role, children[0])
+            elif kind == ConceptKind.OTHER:
+                interned = compiled.intern_other(str(label))
+            else:
+                raise ValueError(f"Concept {concept_id} has an unknown kind")
+            if interned != concept_id:
+                raise ValueError(f"Concept {concept_id} does not get its ID back")
+        for lhs, rhs in axioms:
+            if not (0 <= lhs < len(compiled.concepts) and 0 <= rhs < len(compiled.concepts)):
+                raise ValueError(f"GCI with an unknown concept: {lhs} ⊑ {rhs}")
+            compiled.add_gci(lhs, rhs)
+        return compiled
+
+    def __len__(self):
+        return len(self.concepts)
+
+    def __repr__(self):
+        return (f"CompiledTBox(concepts={len(self.concepts)}, roles={len(self.roles)}, "
+                f"axioms={len(self.axioms)}, names={len(self.names)})")
@@ -0,0 +1,93 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    def __init__(self, callback=None):
+        """
+        Initialize a collector of statistics about loading and saturating.
+        The engines only record anything when they are given an Instrumentation,
+        so there is no cost when it is not used.
+
+        :param callback: Optional function that finish calls with the report dictionary
+        """
+        self.callback = callback
+        self.rules = {}  # Rule name -> {"calls", "facts", "edges", "seconds"}
+        self.counters = {}  # e.g. "elements", "rounds", "py4j_calls"
+        self.phases = {}  # Phase name -> seconds
+
+    def record_rule(self, name, facts, edges, seconds):
+        """
+        Record one application of a rule.
+
+        :param name: Name of the rule
+        :param facts: Number of new (element, concept) facts the rule derived
+        :param edges: Number of new edges the rule derived
+        :param seconds: Time spent in the rule
+        """
+        rule = self.rules.get(name)
+        if rule is None:
+            rule = self.rules[name] = {"calls": 0, "facts": 0, "edges": 0, "seconds": 0.0}
+        rule["calls"] += 1
+        rule["facts"] += facts
+        rule["edges"] += edges
+        rule["seconds"] += seconds
+
+    def count(self, name, amount=1):
+        """
+        Add to a counter.
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase, e.g. with instrumentation.phase("load"): ...
+        Phases with the same name add up.
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count_calls(self, target, method_name, counter):
+        """
+        Count the calls of a method of an object by replacing it on the instance,
+        e.g. send_command of the py4j gateway client for the number of round-trips to the JVM.
+        """
+        method = getattr(target, method_name)
+
+        def counted(*args, **kwargs):
+            self.count(counter)
+            return method(*args, **kwargs)
+
+        setattr(target, method_name, counted)
+
+    def report(self):
+        """
+        Return all statistics as a JSON-compatible dictionary.
+        """
+        totals = {"facts": sum(rule["facts"] for rule in self.rules.values()),
+                  "edges": sum(rule["edges"] for rule in self.rules.values())}
+        return {"phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                "counters": dict(totals, **self.counters),
+                "rules": {name: dict(rule, seconds=round(rule["seconds"], 6)) for name, rule in self.rules.items()}}
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=1)
+
+    def finish(self):
+        """
+        Hand the report to the callback, if there is one.
+
+        :return: The report dictionary
+        """
+        report = self.report()
+        if self.callback is not None:
+            self.callback(report)
+        return report
+
+    def __repr__(self):
+        return f"Instrumentation(rules={len(self.rules)}, counters={self.counters}, phases={self.phases})"
@@ -0,0 +1,167 @@
+import time
+import numpy as np
+import scipy.sparse as sparse
+from CompiledTBox import ConceptKind
+
+
+class MatrixSaturation:
+    def __init__(self, compiled, instrumentation=None):
+        """
+        Initialize a vectorized saturation backend. The model is a sparse boolean concept ×
+        element matrix, where every element is the canonical element of one concept (its filler
+        or a queried name), so the r-edges follow from the ∃r.C columns and are never stored.
+        The ⊑, ⊓ and ∃ rules then run as sparse matrix operations until nothing changes; with
+        boolean matrices, sums and products are or/and, so every result is again a set of facts.
+
+        The ⊑-rule and and-rule 1 only copy a concept to another one in the same element, so
+        their reflexive-transitive closure is computed once here and applied with a single
+        product per round. The number of rounds then depends on how the ⊓ and ∃ rules
+        interleave, not on the length of the told hierarchy.
+
+        Requires numpy and scipy, which are optional dependencies of the reasoner.
+
+        :param compiled: CompiledTBox to reason over
+        :param instrumentation: Optional Instrumentation to record the work of every rule group in
+        """
+        self.compiled = compiled
+        self.instrumentation = instrumentation
+        concepts = compiled.concepts
+        size = len(concepts)
+
+        # ⊑-rule and and-rule 1, as a target × source matrix closed under composition
+        sources, targets = list(range(size)), list(range(size))
+        for lhs, subsumers in compiled.told_subsumers.items():
+            for rhs in subsumers:
+                sources.append(lhs)
+                targets.append(rhs)
+        for concept in concepts:
+            if concept.kind == ConceptKind.CONJUNCTION:
+                for conjunct in concept.children:
+                    sources.append(concept.id)
+                    targets.append(conjunct)
+        closure = sparse.csr_matrix((np.ones(len(sources), dtype=bool), (targets, sources)), shape=(size, size))
+        while True:
+            squared = closure @ closure
+            if squared.nnz == closure.nnz:
+                break
+            closure = squared
+        self.implications = closure
+
+        # and-rule 2, grouped by the number of conjuncts
+        by_arity = {}
+        for concept in concepts:
+            if concept.kind == ConceptKind.CONJUNCTION:
+                by_arity.setdefault(len(concept.children), []).append(concept)
+        self.conjunctions = [(np.array([c.id for c in group], dtype=np.intp),
+                              np.array([c.children for c in group], dtype=np.intp).T)
+                             for group in by_arity.values()]
+
+        # Existentials grouped by role; their fillers are the elements the model needs
+        self.fillers = []
+        by_role = {}
+        for concept in concepts:
+            if concept.kind == ConceptKind.EXISTENTIAL:
+                by_role.setdefault(concept.role, []).append(concept)
+                self.fillers.append(concept.children[0])
+        self.existentials = by_role
+
+    def run(self, concepts, seeds=None):
+        """
+        Saturate the canonical elements of the given concepts (plus all existential fillers).
+
+        :param concepts: IDs of the concepts to compute the subsumers of
+        :param seeds: Optional dictionary from some of the given concept IDs to concept IDs
+                      that are already known to hold in their elements
+        :return: Dictionary from each of the given concept IDs to the set of concept IDs of its element
+        """
+        element_of = {}
+        for concept in list(concepts) + self.fillers:
+            element_of.setdefault(concept, len(element_of))
+        shape = (len(self.compiled.concepts), len(element_of))
+
+        rows = list(element_of) + [self.compiled.top] * len(element_of)
+        columns = list(range(len(element_of))) * 2
+        for concept, known in (seeds or {}).items():
+            rows.extend(known)
+            columns.extend([element_of[concept]] * len(known))
+        model = sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, columns)), shape=shape)
+
+        existential_rules = []
+        for existentials in self.existentials.values():
+            ids = np.array([c.id for c in existentials], dtype=np.intp)
+            fillers = np.array([c.children[0] for c in existentials], dtype=np.intp)
+            filler_elements = np.array([element_of[c.children[0]] for c in existentials], dtype=np.intp)
+            existential_rules.append((ids, fillers, filler_elements))
+
+        instrumentation = self.instrumentation
+        clock = time.perf_counter
+        count = recorded = model.nnz
+        rounds = 0
+        # The rules are applied semi-naively: only to the facts added since they last ran
+        implied = existential_input = sparse.csr_matrix(shape, dtype=bool)
+        while True:
+            rounds += 1
+
+            # ⊑-rule and and-rule 1, to their fixpoint; the closure of the result is the
+            # result, so the next round only needs the facts that are new by then
+            start = clock()
+            model = model + self.implications @ (model != implied)
+            implied = model
+            if instrumentation is not None:
+                recorded = self.record(model, "sub+and1", recorded, clock() - start)
+
+            # and-rule 2
+            start = clock()
+            for ids, children in self.conjunctions:
+                holds = model[children[0]]
+                for child in children[1:]:
+                    holds = holds.multiply(model[child])
+                model = self.add_rows(model, ids, holds)
+            if instrumentation is not None:
+                recorded = self.record(model, "and2", recorded, clock() - start)
+
+            # Existential rules: an element with ∃r.D has the element of D as r-successor,
+            # so it gets ∃r.C whenever C holds in the element of D. Every new pair has a new
+            # successor fact or a new ∃r.D, so only those two products are needed.
+            start = clock()
+            current, new = model, model != existential_input
+            existential_input = current
+            for ids, fillers, filler_elements in existential_rules:
+                successor_has = current[fillers][:, filler_elements]
+                successor_new = new[fillers][:, filler_elements]
+                model = self.add_rows(model, ids, successor_new @ current[ids] + successor_has @ new[ids])
+            if instrumentation is not None:
+                recorded = self.record(model, "exist", recorded, clock() - start)
+
+            if model.nnz == count:
+                break
+            count = model.nnz
+
+        if instrumentation is not None:
+            instrumentation.count("rounds", rounds)
+            instrumentation.count("elements", len(element_of))
+
+        by_element = model.tocsc()
+        return {concept: set(by_element.indices[by_element.indptr[element]:by_element.indptr[element + 1]].tolist())
+                for concept, element in ((concept, element_of[concept]) for concept in concepts)}
+
+    @staticmethod
+    def add_rows(model, ids, derived):
+        """
+        Add derived facts to the model: row i of derived holds in the elements of concept ids[i].
+        """
+        derived = derived.tocoo()
+        if derived.nnz == 0:
+            return model
+        scattered = sparse.csr_matrix((derived.data, (ids[derived.row], derived.col)), shape=model.shape)
+        return model + scattered
+
+    def record(self, model, name, count, seconds):
+        """
+        Record one application of a rule group with the facts it added to the model.
+
+        :return: The new number of facts in the model
+        """
+        self.instrumentation.record_rule(name, model.nnz - count, 0, seconds)
+        return model.nnz
+
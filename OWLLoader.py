@@ -0,0 +1,470 @@
+import re
+import xml.etree.ElementTree as ET
+from CompiledTBox import CompiledTBox
+
+OWL = "{http://www.w3.org/2002/07/owl#}"
+RDF = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}"
+RDFS = "{http://www.w3.org/2000/01/rdf-schema#}"
+XML = "{http://www.w3.org/XML/1998/namespace}"
+
+OWL_THING = "http://www.w3.org/2002/07/owl#Thing"
+OWL_NOTHING = "http://www.w3.org/2002/07/owl#Nothing"
+
+# Changed whenever the loader compiles the same file differently, so DiskCache entries
+# written by an older version are not used
+LOADER_VERSION = 3
+
+# Concept expressions the EL rules support at the top level of an axiom,
+# the same as the allowedConceptTypes of remove_alc_axioms
+EL_EXPRESSIONS = ("name", "top", "and", "some")
+
+# A concept or role name in the output of dl4python's SimpleDLFormatter. Anything else,
+# like a nominal {a} or a name with other characters, is not read as a name.
+DL_NAME = re.compile(r"[\w\-]+")
+
+
+class OWLLoader:
+    def __init__(self, compiled=None):
+        """
+        Initialize a pure-Python loader for RDF/XML and OWL/XML ontologies.
+        It produces the same compiled EL TBox as loading through dl4python followed by
+        remove_alc_axioms, remove_equivalence_axioms and compile_ontology, without a JVM.
+
+        Class expressions are first read into tuples:
+        ("name", name), ("top",), ("and", [conjuncts]), ("some", role, filler) and
+        ("other", label) for everything outside of EL.
+
+        :param compiled: CompiledTBox to add the axioms to, a new one by default
+        """
+        self.compiled = compiled if compiled is not None else CompiledTBox()
+
+    def load(self, ontology_file):
+        """
+        Stream through an ontology file and compile its EL part.
+        Every top-level XML element is converted as soon as it has been read and then
+        discarded, so memory use does not grow with the size of the file.
+
+        :param ontology_file: Path of an RDF/XML or OWL/XML file
+        :return: The CompiledTBox
+        """
+        depth = 0
+        root = None
+        for event, elem in ET.iterparse(ontology_file, events=("start", "end")):
+            if event == "start":
+                if depth == 0:
+                    root = elem
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+            if root.tag == RDF + "RDF":
+                self.read_rdf_node(elem)
+            elif root.tag == OWL + "Ontology":
+                self.read_owl_axiom(elem)
+            else:
+                raise ValueError(f"Unsupported ontology format: {root.tag}")
+            root.clear()
+
+        return self.compiled
+
+    def load_dl_text(self, text):
+        """
+        Compile a TBox from its DL syntax, one GCI or equivalence per line, as written by
+        dl4python's SimpleDLFormatter. This lets the Java gateway hand over a whole TBox
+        as a single string.
+
+        :param text: Formatted TBox
+        :return: The CompiledTBox
+        :raises ValueError: If a line is not a GCI or equivalence in the expected syntax
+        """
+        for line in text.splitlines():
+            if line.strip():
+                self.read_dl_axiom(line)
+        return self.compiled
+
+    # ---- Adding axioms ----
+
+    def add_subsumption(self, lhs, rhs):
+        """
+        Add lhs ⊑ rhs, unless one of the sides is not an EL concept.
+        """
+        if lhs[0] not in EL_EXPRESSIONS or rhs[0] not in EL_EXPRESSIONS:
+            return
+        self.compiled.add_gci(self.intern(lhs), self.intern(rhs))
+
+    def add_equivalence(self, expressions):
+        """
+        Add the equivalence of all given concepts as GCIs in both directions,
+        unless one of them is not an EL concept.
+        """
+        if any(expression[0] not in EL_EXPRESSIONS for expression in expressions):
+            return
+        for a, b in zip(expressions, expressions[1:]):
+            self.add_subsumption(a, b)
+            self.add_subsumption(b, a)
+
+    def add_domain(self, role, expression):
+        """
+        Add the domain restriction of a role as ∃role.⊤ ⊑ expression.
+        """
+        self.add_subsumption(("some", role, ("top",)), expression)
+
+    def intern(self, expression):
+        """
+        Intern a class expression into the compiled TBox.
+        Conjunctions are made binary like convertToBinaryConjunctions does: A ⊓ B ⊓ C becomes A ⊓ (B ⊓ C).
+
+        :return: Concept ID
+        """
+        kind = expression[0]
+        if kind == "name":
+            return self.compiled.intern_name(expression[1])
+        if kind == "top":
+            return self.compiled.top
+        if kind == "and":
+            conjuncts = [self.intern(conjunct) for conjunct in expression[1]]
+            concept_id = conjuncts[-1]
+            for conjunct in reversed(conjuncts[:-1]):
+                concept_id = self.compiled.intern_conjunction(conjunct, concept_id)
+            return concept_id
+        if kind == "some":
+            return self.compiled.intern_existential(self.compiled.intern_role(expression[1]),
+                                                    self.intern(expression[2]))
+        return self.compiled.intern_other(expression[1])
+
+    def lookup(self, expression):
+        """
+        Find the concept ID of a class expression without adding anything to the compiled TBox.
+
+        :return: Concept ID, or None if the concept does not occur in the TBox
+        """
+        kind = expression[0]
+        if kind == "name":
+            return self.compiled.name_id(expression[1])
+        if kind == "top":
+            return self.compiled.top
+        if kind == "and":
+            conjuncts = [self.lookup(conjunct) for conjunct in expression[1]]
+            if None in conjuncts:
+                return None
+            concept_id = conjuncts[-1]
+            for conjunct in reversed(conjuncts[:-1]):
+                concept_id = self.compiled.lookup_conjunction(conjunct, concept_id)
+                if concept_id is None:
+                    return None
+            return concept_id
+        if kind == "some":
+            role, filler = self.compiled.role_id(expression[1]), self.lookup(expression[2])
+            if role is None or filler is None:
+                return None
+            return self.compiled.lookup_existential(role, filler)
+        return self.compiled.lookup_other(expression[1])
+
+    # ---- RDF/XML ----
+
+    def read_rdf_node(self, node):
+        """
+        Read a top-level node of an RDF/XML file.
+        """
+        if node.tag == OWL + "ObjectProperty":
+            role = short_form(node.get(RDF + "about"))
+            self.compiled.intern_role(role)
+            for child in node:
+                if child.tag == RDFS + "domain":
+                    self.add_domain(role, self.read_rdf_object(child))
+            return
+
+        if node.tag not in (OWL + "Class", OWL + "Restriction", RDF + "Description"):
+            return
+        if node.tag == RDF + "Description" and node.get(RDF + "about") is None:
+            # e.g. owl:AllDisjointClasses, which is not expressible in EL
+            return
+
+        subject = self.read_rdf_class(node)
+        if subject[0] == "name" and node.tag == OWL + "Class":
+            self.compiled.intern_name(subject[1])
+        for child in node:
+            if child.tag == RDFS + "subClassOf":
+                self.add_subsumption(subject, self.read_rdf_object(child))
+            elif child.tag == OWL + "equivalentClass":
+                self.add_equivalence([subject, self.read_rdf_object(child)])
+
+    def read_rdf_object(self, prop):
+        """
+        Read the class expression a property element points to, either by rdf:resource or nested.
+        """
+        resource = prop.get(RDF + "resource")
+        if resource is not None:
+            return iri_expression(resource)
+        node_id = prop.get(RDF + "nodeID")
+        if node_id is not None:
+            # Blank nodes defined elsewhere in the file are not resolved, they stay atoms
+            return ("other", "_:" + node_id)
+        for child in prop:
+            return self.read_rdf_class(child)
+        return ("other", "?")
+
+    def read_rdf_value(self, prop):
+        """
+        Format the value of a restriction property: a literal with its datatype or language,
+        or the class expression it points to.
+        """
+        if prop.get(RDF + "resource") is None and len(prop) == 0 and prop.get(RDF + "nodeID") is None:
+            return literal_label(prop.text, prop.get(RDF + "datatype"), prop.get(XML + "lang"))
+        return format_expression(self.read_rdf_object(prop))
+
+    def read_rdf_class(self, node):
+        """
+        Read a class node (owl:Class, owl:Restriction or rdf:Description) as a class expression.
+        """
+        about = node.get(RDF + "about")
+        if about is not None:
+            return iri_expression(about)
+
+        if node.tag == OWL + "Restriction":
+            role = None
+            values = []
+            for child in node:
+                if child.tag == OWL + "onProperty":
+                    role = child.get(RDF + "resource")
+                elif child.tag != RDFS + "subClassOf" and child.tag != OWL + "equivalentClass":
+                    values.append(child)
+            if role is not None and len(values) == 1 and values[0].tag == OWL + "someValuesFrom":
+                return ("some", short_form(role), self.read_rdf_object(values[0]))
+            # Every part goes into the label (e.g. the owl:onClass of a qualified cardinality),
+            # so different restrictions never become the same atom
+            restriction = "?"
+            parts = []
+            qualifiers = []
+            for value in values:
+                tag = value.tag.split("}")[-1]
+                if value.tag in (OWL + "onClass", OWL + "onDataRange"):
+                    qualifiers.append(f"{tag} {self.read_rdf_value(value)}")
+                else:
+                    restriction = tag if restriction == "?" else restriction + "+" + tag
+                    parts.append(self.read_rdf_value(value))
+            label = " ".join([restriction, short_form(role or "?")] + parts + sorted(qualifiers))
+            return ("other", f"({label})")
+
+        for child in node:
+            if child.tag == OWL + "intersectionOf":
+                return ("and", [self.read_rdf_class(member) for member in child])
+            if child.tag == OWL + "unionOf":
+                return ("other", "(" + " ⊔ ".join(
+                    format_expression(self.read_rdf_class(member)) for member in child) + ")")
+            if child.tag == OWL + "complementOf":
+                return ("other", "¬" + format_expression(self.read_rdf_object(child)))
+            if child.tag == OWL + "oneOf":
+                return ("other", "{" + ", ".join(
+                    short_form(member.get(RDF + "about") or "?") for member in child) + "}")
+        return ("other", "?")
+
+    # ---- DL syntax ----
+
+    def read_dl_axiom(self, line):
+        """
+        Read one formatted axiom, "C ⊑ D" or "C ≡ D [≡ E ...]".
+        """
+        try:
+            concepts = []
+            separators = set()
+            position = 0
+            while True:
+                expression, position = parse_dl_concept(line, position)
+                concepts.append(expression)
+                position = skip_spaces(line, position)
+                if position == len(line):
+                    break
+                separators.add(line[position])
+                position += 1
+        except IndexError:
+            raise ValueError(f"Unexpected end of axiom: {line}")
+
+        if separators == {"⊑"} and len(concepts) == 2:
+            self.add_subsumption(concepts[0], concepts[1])
+        elif separators == {"≡"}:
+            self.add_equivalence(concepts)
+        else:
+            raise ValueError(f"Not a concept inclusion or equivalence: {line}")
+
+    # ---- OWL/XML ----
+
+    def read_owl_axiom(self, axiom):
+        """
+        Read a top-level element of an OWL/XML file.
+        """
+        tag = axiom.tag
+        if tag == OWL + "Declaration":
+            for entity in axiom:
+                if entity.tag == OWL + "Class":
+                    expression = self.read_owl_class(entity)
+                    if expression[0] == "name":
+                        self.compiled.intern_name(expression[1])
+                elif entity.tag == OWL + "ObjectProperty":
+                    self.compiled.intern_role(owl_xml_name(entity))
+        elif tag == OWL + "SubClassOf":
+            lhs, rhs = [self.read_owl_class(child) for child in axiom if child.tag != OWL + "Annotation"]
+            self.add_subsumption(lhs, rhs)
+        elif tag == OWL + "EquivalentClasses":
+            self.add_equivalence([self.read_owl_class(child) for child in axiom if child.tag != OWL + "Annotation"])
+        elif tag == OWL + "ObjectPropertyDomain":
+            prop, domain = [child for child in axiom if child.tag != OWL + "Annotation"]
+            if prop.tag == OWL + "ObjectProperty":
+                self.add_domain(owl_xml_name(prop), self.read_owl_class(domain))
+
+    def read_owl_class(self, node):
+        """
+        Read an OWL/XML class expression.
+        """
+        tag = node.tag
+        if tag == OWL + "Class":
+            iri = node.get("IRI") or node.get("abbreviatedIRI")
+            if iri in (OWL_THING, "owl:Thing"):
+                return ("top",)
+            if iri in (OWL_NOTHING, "owl:Nothing"):
+                return ("other", "⊥")
+            return ("name", owl_xml_name(node))
+        if tag == OWL + "ObjectIntersectionOf":
+            return ("and", [self.read_owl_class(child) for child in node])
+        if tag == OWL + "ObjectSomeValuesFrom":
+            prop, filler = node
+            if prop.tag == OWL + "ObjectProperty":
+                return ("some", owl_xml_name(prop), self.read_owl_class(filler))
+
+        # Everything else is outside of EL and only kept as an atom
+        parts = []
+        for child in node:
+            if child.tag == OWL + "Literal":
+                parts.append(literal_label(child.text, child.get("datatypeIRI"), child.get(XML + "lang")))
+            elif child.tag != OWL + "Class" and (child.get("IRI") or child.get("abbreviatedIRI")):
+                parts.append(owl_xml_name(child))
+            else:
+                parts.append(format_expression(self.read_owl_class(child)))
+        cardinality = node.get("cardinality")
+        if cardinality is not None:
+            parts.insert(0, cardinality)
+        return ("other", f"({tag.split('}')[-1]} {' '.join(parts)})")
+
+
+def short_form(iri):
+    """
+    Return the name dl4python uses for an IRI, i.e. the part after the last # (or /).
+    """
+    for separator in ("#", "/"):
+        if separator in iri:
+            return iri.rsplit(separator, 1)[1]
+    return iri
+
+
+def literal_label(text, datatype=None, language=None):
+    """
+    Format a literal for the label of a concept outside of EL, e.g. "5"^^integer or "five"@en.
+    """
+    label = '"' + (text or "").strip() + '"'
+    if language:
+        return label + "@" + language
+    if datatype:
+        return label + "^^" + short_form(datatype)
+    return label
+
+
+def iri_expression(iri):
+    """
+    Return the class expression for a class IRI, taking care of owl:Thing and owl:Nothing.
+    """
+    if iri == OWL_THING:
+        return ("top",)
+    if iri == OWL_NOTHING:
+        return ("other", "⊥")
+    return ("name", short_form(iri))
+
+
+def owl_xml_name(node):
+    """
+    Return the short name of an OWL/XML entity given by IRI or abbreviatedIRI.
+    """
+    iri = node.get("IRI")
+    if iri is not None:
+        return short_form(iri)
+    return node.get("abbreviatedIRI", "?").split(":", 1)[-1]
+
+
+def parse_dl_concept(text, position=0):
+    """
+    Parse a concept in the syntax of dl4python's SimpleDLFormatter into a class expression.
+    Concepts outside of EL keep their formatted text as label, which is what
+    formatter.format returns for them.
+
+    :param text: Formatted text
+    :param position: Index in text the concept starts at (leading spaces are skipped)
+    :return: Tuple of the class expression and the index after the concept
+    :raises ValueError: If the text is not a concept in the expected syntax
+    :raises IndexError: If the text ends inside the concept
+    """
+    start = position = skip_spaces(text, position)
+    symbol = text[position]
+    if symbol == "⊤":
+        return ("top",), position + 1
+    if symbol == "⊥":
+        return ("other", "⊥"), position + 1
+    if symbol == "¬":
+        _, position = parse_dl_concept(text, position + 1)
+        return ("other", text[start:position]), position
+    if symbol == "{":
+        position = text.index("}", position) + 1
+        return ("other", text[start:position]), position
+    if symbol in "∃∀":
+        match = DL_NAME.match(text, skip_spaces(text, position + 1))
+        if match is None or text[match.end():match.end() + 1] != ".":
+            raise ValueError(f"Expected a role at {position} in: {text}")
+        filler, position = parse_dl_concept(text, match.end() + 1)
+        if symbol == "∃":
+            return ("some", match.group(), filler), position
+        return ("other", text[start:position]), position
+    if symbol == "(":
+        parts = []
+        operators = set()
+        position += 1
+        while True:
+            expression, position = parse_dl_concept(text, position)
+            parts.append(expression)
+            position = skip_spaces(text, position)
+            if text[position] == ")":
+                position += 1
+                break
+            if text[position] not in "⊓⊔":
+                raise ValueError(f"Expected ⊓ or ⊔ at {position} in: {text}")
+            operators.add(text[position])
+            position += 1
+        if not operators:
+            return parts[0], position
+        if operators == {"⊓"}:
+            return ("and", parts), position
+        return ("other", text[start:position]), position
+
+    match = DL_NAME.match(text, position)
+    if match is None:
+        raise ValueError(f"Expected a concept at {position} in: {text}")
+    return ("name", match.group()), match.end()
+
+
+def skip_spaces(text, position):
+    while position < len(text) and text[position].isspace():
+        position += 1
+    return position
+
+
+def format_expression(expression):
+    """
+    Format a class expression in DL syntax. Used as the identity of concepts outside of EL.
+    """
+    kind = expression[0]
+    if kind == "top":
+        return "⊤"
+    if kind == "and":
+        return "(" + " ⊓ ".join(format_expression(conjunct) for conjunct in expression[1]) + ")"
+    if kind == "some":
+        return f"(∃{expression[1]}.{format_expression(expression[2])})"
+    return expression[1]
@@ -0,0 +1,154 @@
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+from CompiledTBox import CompiledTBox
+
+
+class OntologyCache:
+    def __init__(self, max_size):
+        """
+        Initialize an in-memory LRU cache of compiled ontologies, or of Reasoners over them.
+
+        :param max_size: Maximum total size of the cached entries: concepts + axioms of a compiled
+                         ontology, see Reasoner.size for a Reasoner
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()  # path -> (mtime, CompiledTBox or Reasoner, size), least recently used first
+
+    @staticmethod
+    def entry_size(entry):
+        if hasattr(entry, "size"):
+            return entry.size()
+        return len(entry.concepts) + len(entry.axioms)
+
+    def get(self, ontology_file):
+        """
+        Find a cached ontology and mark it as most recently used.
+        An entry whose file was modified since it was cached is dropped.
+
+        :return: The cached entry, or None if the file is not cached
+        """
+        path = os.path.abspath(ontology_file)
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        if entry[0] != os.path.getmtime(path):
+            self.remove(path)
+            return None
+        self.entries.move_to_end(path)
+        return entry[1]
+
+    def put(self, ontology_file, compiled):
+        """
+        Cache a compiled ontology and evict the least recently used ones until the cache fits.
+        An ontology larger than max_size is still kept until the next one is added.
+        """
+        path = os.path.abspath(ontology_file)
+        self.remove(path)
+        size = self.entry_size(compiled)
+        self.entries[path] = (os.path.getmtime(path), compiled, size)
+        self.size += size
+        self.evict()
+
+    def refresh(self, ontology_file):
+        """
+        Measure a cached entry again after it grew, e.g. a Reasoner that answered a query,
+        and evict the least recently used other entries until the cache fits.
+        """
+        path = os.path.abspath(ontology_file)
+        entry = self.entries.get(path)
+        if entry is None:
+            return
+        mtime, cached, old_size = entry
+        size = self.entry_size(cached)
+        self.entries[path] = (mtime, cached, size)
+        self.size += size - old_size
+        self.evict()
+
+    def evict(self):
+        """
+        Evict the least recently used entries until the cache fits, keeping at least the newest one.
+        """
+        while self.size > self.max_size and len(self.entries) > 1:
+            _, (_, _, size) = self.entries.popitem(last=False)
+            self.size -= size
+
+    def remove(self, ontology_file):
+        """
+        Drop an ontology from the cache if it is cached.
+        """
+        entry = self.entries.pop(os.path.abspath(ontology_file), None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"OntologyCache(entries={len(self.entries)}, size={self.size}, max_size={self.max_size})"
+
+
+class DiskCache:
+    def __init__(self, cache_dir, tag="jvm"):
+        """
+        Initialize an on-disk cache of compiled ontologies.
+        Entries are keyed by a hash of the ontology file's content, so a renamed or copied
+        file is still a hit and an edited file is a miss.
+
+        :param cache_dir: Directory the compiled ontologies are written to
+        :param tag: Name of the loader, so the JVM and native loader do not share entries
+        """
+        self.cache_dir = cache_dir
+        self.tag = tag
+
+    @staticmethod
+    def default_dir():
+        """
+        Return the default cache directory, $XDG_CACHE_HOME/el_reasoner or ~/.cache/el_reasoner.
+        """
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(base, "el_reasoner")
+
+    def path(self, ontology_file):
+        """
+        Return the cache file path for an ontology file.
+        """
+        digest = hashlib.sha256()
+        with open(ontology_file, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.{self.tag}.eltbox")
+
+    def get(self, ontology_file):
+        """
+        Read the compiled ontology for a file from the cache.
+
+        :return: CompiledTBox, or None if it is not cached or the entry can not be read
+        """
+        try:
+            with open(self.path(ontology_file), "rb") as file:
+                return CompiledTBox.load(file)
+        except (OSError, ValueError, TypeError, IndexError):
+            return None
+
+    def put(self, ontology_file, compiled):
+        """
+        Write the compiled ontology for a file to the cache.
+        The entry is written to a temporary file first, so concurrent readers never
+        see a partially written entry.
+        """
+        cache_path = self.path(ontology_file)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                compiled.save(file)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def __repr__(self):
+        return f"DiskCache(cache_dir={self.cache_dir}, tag={self.tag})"
@@ -0,0 +1,319 @@
+from collections import OrderedDict
+from Saturation import Saturation
+from OWLLoader import OWLLoader, EL_EXPRESSIONS, parse_dl_concept, skip_spaces
+
+
+class Reasoner:
+    def __init__(self, compiled, backend="worklist", use_modules=False, collapse=True,
+                 cache_size=1024, max_elements=100000, instrumentation=None):
+        """
+        Initialize a reasoner that owns one compiled ontology and answers subsumption
+        queries about its concept names. Unlike the module functions of el_reasoner it
+        keeps no global state, so several reasoners can live in one process.
+
+        Answers are kept in a bounded LRU cache, so a repeated query is answered from memory.
+        Without modules, the worklist backend also keeps one shared model over the whole
+        TBox: a query only adds the element of its class, and every element an earlier query
+        created (its class, or an existential filler) is reused as it is, already saturated.
+
+        The compiled TBox must only be changed through add_gci and remove_gci, which keep the
+        shared model and the cached answers consistent with it.
+
+        :param compiled: CompiledTBox to reason over
+        :param backend: "worklist" or "matrix" (needs numpy and scipy)
+        :param use_modules: Saturate the reachability module of every queried class on its own
+                            instead of sharing one model over the whole TBox
+        :param collapse: Merge concept names that are equivalent by told subsumptions first
+        :param cache_size: Maximum number of classes whose subsumers are cached
+        :param max_elements: The shared model is dropped and started over once it has more elements
+        :param instrumentation: Optional Instrumentation to record the work of the saturations in
+        """
+        self.compiled = compiled
+        self.backend = backend
+        self.use_modules = use_modules
+        self.collapse = collapse
+        self.cache_size = cache_size
+        self.max_elements = max_elements
+        self.instrumentation = instrumentation
+        self.results = OrderedDict()  # Name ID -> tuple of subsumer name IDs, least recently used first
+        self.saturation = None  # Shared worklist model over the collapsed TBox, created on first use
+        self._collapsed = None  # (collapsed CompiledTBox, representative dictionary)
+
+    @classmethod
+    def from_file(cls, ontology_file, **kwargs):
+        """
+        Load an ontology with the pure-Python OWL loader. To load through the Java gateway,
+        compile it with el_reasoner.load_compiled and pass the CompiledTBox to the constructor.
+
+        :param ontology_file: Path of the OWL file
+        :param kwargs: Arguments of the constructor
+        :return: Reasoner over the ontology
+        """
+        return cls(OWLLoader().load(ontology_file), **kwargs)
+
+    def subsumers(self, name):
+        """
+        Return the names of the concept names subsuming a class, including the class itself.
+
+        :param name: Name of the class
+        :return: List of names, in ontology order
+        """
+        return [self.compiled.concepts[subsumer].label for subsumer in self.subsumer_ids(name)]
+
+    def subsumes(self, super_name, sub_name):
+        """
+        Check whether super_name subsumes sub_name, i.e. sub_name ⊑ super_name.
+        A cached answer or a saturated element of sub_name in the shared model is used if
+        there is one. Otherwise only the concepts that can lead to super_name are derived
+        (CompiledTBox.relevant_for), and the saturation stops as soon as it is found; this
+        always uses the worklist engine, the matrix backend can not stop early.
+
+        :param super_name: Name of the subsumer
+        :param sub_name: Name of the subsumee
+        :return: True if sub_name is subsumed by super_name
+        """
+        subsumee, goal = self.name_id(sub_name), self.name_id(super_name)
+        if subsumee == goal:
+            return True
+        cached = self.results.get(subsumee)
+        if cached is not None:
+            self.results.move_to_end(subsumee)
+            return goal in cached
+
+        if self.use_modules:
+            compiled_tbox = self.compiled.extract_module([subsumee])
+            if compiled_tbox.name_id(super_name) is None:
+                # super_name is outside of the module, so it is not a subsumer
+                return False
+            subsumee, goal = compiled_tbox.name_id(sub_name), compiled_tbox.name_id(super_name)
+            if self.collapse:
+                compiled_tbox, representative = compiled_tbox.collapse_equivalent_names()
+                subsumee, goal = representative[subsumee], representative[goal]
+        else:
+            compiled_tbox, representative = self.collapsed()
+            subsumee, goal = representative[subsumee], representative[goal]
+            if self.saturation is not None:
+                element = self.saturation.world.get_element_by_concept(subsumee)
+                if element is not None:
+                    return element.has_concept(goal)
+        if subsumee == goal:
+            return True
+
+        saturation = Saturation(compiled_tbox, relevant=compiled_tbox.relevant_for(goal),
+                                instrumentation=self.instrumentation)
+        init_element = saturation.create_element(subsumee)
+        return saturation.run((init_element, goal))
+
+    def subsumer_ids(self, name):
+        """
+        Return the IDs of the concept names subsuming a class, from the cache if possible.
+
+        :param name: Name of the class
+        :return: List of concept name IDs, in ontology order
+        """
+        subsumee = self.name_id(name)
+        cached = self.results.get(subsumee)
+        if cached is not None:
+            self.results.move_to_end(subsumee)
+            return list(cached)
+
+        if self.use_modules:
+            module = self.compiled.extract_module([subsumee])
+            module_reasoner = Reasoner(module, self.backend, collapse=self.collapse, cache_size=0,
+                                       instrumentation=self.instrumentation)
+            subsumers = [self.compiled.name_id(module.concepts[subsumer].label)
+                         for subsumer in module_reasoner.subsumer_ids(name)]
+        else:
+            subsumers = self.classify([subsumee])[subsumee]
+        self.remember(subsumee, subsumers)
+        return subsumers
+
+    def classify(self, names=None):
+        """
+        Compute the subsumers of several concept names at once. Names that are equivalent by
+        told subsumptions share one representative, and the results are expanded back to every name.
+        The results are not cached, so classifying a large ontology does not flush the cache.
+
+        :param names: IDs of the concept names, all concept names by default
+        :return: Dictionary from each of the names to the IDs of its subsuming concept names, in ontology order
+        """
+        if names is None:
+            names = self.compiled.names
+        collapsed, representative = self.collapsed()
+        model = self.saturate_names(collapsed, list(dict.fromkeys(representative[name] for name in names)))
+        return {name: [subsumer for subsumer in self.compiled.names
+                       if representative[subsumer] in model[representative[name]]]
+                for name in names}
+
+    def saturate_names(self, compiled_tbox, names):
+        """
+        Saturate the given concept names with the selected backend.
+        Names in the atomic part of the told hierarchy (CompiledTBox.told_name_hierarchy) are
+        answered by their transitive closure without running any rules. The elements of all
+        other names start out with their closure, so the rules do not derive it again; with
+        the worklist backend they are added to the shared model, where names that already
+        have an element are not saturated again.
+
+        :return: Dictionary from each of the names to the concept IDs holding in its element
+        """
+        closure, atomic = compiled_tbox.told_name_hierarchy()
+        model = {name: set(compiled_tbox.names_in(closure[name])) for name in names if name in atomic}
+        seeds = {name: compiled_tbox.names_in(closure[name]) for name in names if name not in atomic}
+        if not seeds:
+            return model
+
+        if self.backend == "matrix":
+            from MatrixSaturation import MatrixSaturation
+            model.update(MatrixSaturation(compiled_tbox, self.instrumentation).run(list(seeds), seeds))
+            return model
+
+        if self.saturation is None or len(self.saturation.world.elements) > self.max_elements:
+            self.saturation = Saturation(compiled_tbox, instrumentation=self.instrumentation)
+        saturation = self.saturation
+        for name, known in seeds.items():
+            element = saturation.world.get_element_by_concept(name)
+            if element is None:
+                element = saturation.create_element(name)
+                for concept in known:
+                    saturation.add_concept(element, concept)
+            model[name] = element.concepts
+        saturation.run()
+        return model
+
+    def add_gci(self, lhs, rhs):
+        """
+        Add the GCI lhs ⊑ rhs to the ontology; names that are new are added as well.
+        If the shared model runs on this TBox itself (no names were collapsed), it is kept
+        and only the consequences of the GCI are derived (Saturation.add_gci). Otherwise
+        the model is started over on the next query. The cached answers are dropped.
+
+        :param lhs: Subsumee, as a concept name, a concept in DL syntax (e.g. "A ⊓ ∃r.B")
+                    or a class expression of OWLLoader
+        :param rhs: Subsumer, in the same forms
+        :raises ValueError: If a side can not be parsed or is not an EL concept
+        """
+        lhs, rhs = self.expression(lhs), self.expression(rhs)
+        if lhs[0] not in EL_EXPRESSIONS or rhs[0] not in EL_EXPRESSIONS:
+            raise ValueError("Only GCIs between EL concepts can be added")
+        loader = OWLLoader(self.compiled)
+        lhs, rhs = loader.intern(lhs), loader.intern(rhs)
+        if self.incremental():
+            self.saturation.add_gci(lhs, rhs)
+            self._collapsed = (self.compiled, {name: name for name in self.compiled.names})
+        else:
+            self.compiled.add_gci(lhs, rhs)
+            self.saturation = self._collapsed = None
+        self.results.clear()
+
+    def remove_gci(self, lhs, rhs):
+        """
+        Remove one occurrence of the GCI lhs ⊑ rhs from the ontology. The shared model is
+        updated or started over as in add_gci, and the cached answers are dropped.
+
+        :param lhs: Subsumee, in the forms of add_gci
+        :param rhs: Subsumer, in the forms of add_gci
+        :return: True if the GCI was in the ontology
+        :raises ValueError: If a side can not be parsed
+        """
+        loader = OWLLoader(self.compiled)
+        lhs, rhs = loader.lookup(self.expression(lhs)), loader.lookup(self.expression(rhs))
+        if (lhs, rhs) not in self.compiled.axioms:
+            return False
+        if self.incremental():
+            self.saturation.remove_gci(lhs, rhs)
+        else:
+            self.compiled.remove_gci(lhs, rhs)
+            self.saturation = self._collapsed = None
+        self.results.clear()
+        return True
+
+    def incremental(self):
+        """
+        Check whether the shared model can follow a change of the TBox: it must exist and
+        run on this TBox itself, not on a collapsed copy.
+        """
+        return self.saturation is not None and self.collapsed()[0] is self.compiled
+
+    def expression(self, concept):
+        """
+        Turn an argument of add_gci or remove_gci into a class expression of OWLLoader.
+
+        :param concept: Concept name, concept in DL syntax or class expression
+        :return: Class expression
+        :raises ValueError: If the text is not a concept in DL syntax
+        """
+        if isinstance(concept, tuple):
+            return concept
+        if self.compiled.name_id(concept) is not None:
+            return ("name", concept)
+        # In parentheses, a conjunction needs none of its own at the top level
+        text = f"({concept})"
+        try:
+            expression, position = parse_dl_concept(text)
+        except IndexError:
+            raise ValueError(f"Unexpected end of concept: {concept}")
+        if skip_spaces(text, position) != len(text):
+            raise ValueError(f"Unexpected text after the concept: {concept}")
+        return expression
+
+    def collapsed(self):
+        """
+        Return the TBox the saturations run on: with collapse, the TBox with equivalent
+        concept names merged (CompiledTBox.collapse_equivalent_names), computed once.
+
+        :return: (CompiledTBox, dictionary from concept name ID to its representative)
+        """
+        if self._collapsed is None:
+            if self.collapse:
+                self._collapsed = self.compiled.collapse_equivalent_names()
+            else:
+                self._collapsed = (self.compiled, {name: name for name in self.compiled.names})
+        return self._collapsed
+
+    def name_id(self, name):
+        """
+        Look up a concept name.
+
+        :raises KeyError: If the name does not exist in the ontology
+        """
+        concept = self.compiled.name_id(name)
+        if concept is None:
+            raise KeyError(f"{name} does not exist in the ontology")
+        return concept
+
+    def remember(self, name, subsumers):
+        """
+        Cache the subsumers of a concept name and evict the least recently used ones beyond cache_size.
+        """
+        if self.cache_size <= 0:
+            return
+        self.results[name] = tuple(subsumers)
+        self.results.move_to_end(name)
+        while len(self.results) > self.cache_size:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop the cached results and the shared model.
+        """
+        self.results.clear()
+        self.saturation = None
+
+    def size(self):
+        """
+        Return the size of the reasoner in the units of OntologyCache: the concepts and axioms
+        of its TBoxes, plus one per element and fact of the shared model and per cached subsumer.
+
+        :return: Size of the reasoner
+        """
+        size = len(self.compiled.concepts) + len(self.compiled.axioms)
+        if self._collapsed is not None and self._collapsed[0] is not self.compiled:
+            size += len(self._collapsed[0].concepts) + len(self._collapsed[0].axioms)
+        if self.saturation is not None:
+            size += sum(1 + len(element.concepts) for element in self.saturation.world.elements)
+        return size + sum(len(subsumers) for subsumers in self.results.values())
+
+    def __repr__(self):
+        elements = len(self.saturation.world.elements) if self.saturation is not None else 0
+        return (f"Reasoner(names={len(self.compiled.names)}, backend={self.backend}, "
+                f"cached={len(self.results)}, elements={elements})")
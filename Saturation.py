@@ -0,0 +1,310 @@
+import time
+from collections import deque
+from World import World, Element
+from CompiledTBox import ConceptKind
+
+
+class Saturation:
+    def __init__(self, compiled, world=None, relevant=None, instrumentation=None):
+        """
+        Initialize a worklist-driven completion over a compiled TBox.
+        Every (element, concept) fact and every edge is queued exactly once when it is
+        derived, and only the rules that can fire on that fact are applied to it.
+
+        :param compiled: CompiledTBox to reason over
+        :param world: World to extend, a new empty World by default
+        :param relevant: Optional set of concept IDs (see CompiledTBox.relevant_for); other
+                         concepts are never derived, apart from the initial concepts of elements
+        :param instrumentation: Optional Instrumentation to record the work of every rule in
+        """
+        self.compiled = compiled
+        self.world = world if world is not None else World()
+        self.relevant = relevant
+        self.instrumentation = instrumentation
+        self.facts = deque()  # Pending (element, concept ID) facts
+        self.edges = deque()  # Pending (element, role ID, successor) edges
+        self.known_concepts = len(compiled.concepts)  # Concepts the model has been saturated with
+        self.images = {}  # Element -> {role ID: [IDs of ∃role.C for the processed concepts C of the element]}
+
+    def create_element(self, concept):
+        """
+        Create a new element with the given initial concept and queue its first facts.
+
+        :param concept: Concept ID the element is created for
+        :return: The new element
+        """
+        element = Element(len(self.world.elements))
+        self.add_initial_concept(element, concept)
+        self.world.add_element(element)
+        self.apply_t_rule(element)
+        return element
+
+    def add_initial_concept(self, element, concept):
+        """
+        Add the concept an element is created for, which is never filtered out.
+        """
+        if element.add_concept(concept):
+            self.facts.append((element, concept))
+
+    def add_concept(self, element, concept):
+        """
+        Add a concept to an element and queue it if it is new.
+
+        :return: True if the concept was not yet in the element
+        """
+        # Most derivations are already known, so check membership before anything else
+        if concept in element.concepts:
+            return False
+        if self.relevant is not None and concept not in self.relevant:
+            return False
+        element.add_concept(concept)
+        self.facts.append((element, concept))
+        return True
+
+    def add_edge(self, element, role, successor):
+        """
+        Connect two elements with a role and queue the edge if it is new.
+
+        :return: True if the edge did not exist yet
+        """
+        if successor in element.get_connections(role):
+            return False
+        element.connect_to(successor, role)
+        self.edges.append((element, role, successor))
+        return True
+
+    def run(self, goal=None):
+        """
+        Apply the rules to all pending facts and edges until nothing new is derived.
+
+        :param goal: Optional (element, concept ID); stop as soon as the element has the concept.
+                     The remaining facts stay queued, so calling run again continues the saturation.
+        :return: True if the goal was derived
+        """
+        if self.instrumentation is not None:
+            return self.run_instrumented(goal)
+
+        facts, edges = self.facts, self.edges
+        while facts or edges:
+            while facts:
+                if goal is not None and goal[0].has_concept(goal[1]):
+                    return True
+                element, concept = facts.popleft()
+                self.apply_sub_rule(element, concept)
+                self.apply_and_rule_1(element, concept)
+                self.apply_and_rule_2(element, concept)
+                self.apply_exist_rule_1(element, concept)
+                self.apply_exist_rule_2(element, concept)
+            while edges:
+                self.apply_edge_rule(*edges.popleft())
+        return goal is not None and goal[0].has_concept(goal[1])
+
+    def run_instrumented(self, goal=None):
+        """
+        The same as run, but record the calls, derived facts and edges and time of every rule,
+        the rounds of the outer loop (fact phases alternating with edge phases) and the
+        number of elements created.
+        """
+        instrumentation = self.instrumentation
+        clock = time.perf_counter
+        rules = [("sub", self.apply_sub_rule), ("and1", self.apply_and_rule_1), ("and2", self.apply_and_rule_2),
+                 ("exist1", self.apply_exist_rule_1), ("exist2", self.apply_exist_rule_2)]
+        facts, edges = self.facts, self.edges
+        elements = len(self.world.elements)
+        rounds = 0
+        reached = False
+
+        while (facts or edges) and not reached:
+            rounds += 1
+            while facts:
+                if goal is not None and goal[0].has_concept(goal[1]):
+                    reached = True
+                    break
+                element, concept = facts.popleft()
+                for name, rule in rules:
+                    queued, linked = len(facts), len(edges)
+                    start = clock()
+                    rule(element, concept)
+                    instrumentation.record_rule(name, len(facts) - queued, len(edges) - linked, clock() - start)
+            while edges and not reached:
+                edge = edges.popleft()
+                queued = len(facts)
+                start = clock()
+                self.apply_edge_rule(*edge)
+                instrumentation.record_rule("propagate", len(facts) - queued, 0, clock() - start)
+
+        instrumentation.count("rounds", rounds)
+        instrumentation.count("elements", len(self.world.elements) - elements)
+        return goal is not None and goal[0].has_concept(goal[1])
+
+    def apply_t_rule(self, element: Element):
+        """
+        Apply T-rule for an element by adding the top concept
+        """
+        self.add_concept(element, self.compiled.top)
+
+    def apply_sub_rule(self, element: Element, concept):
+        """
+        Apply subsumption rule: add every told subsumer of the new concept
+        """
+        for subsumer in self.compiled.told_subsumers.get(concept, ()):
+            self.add_concept(element, subsumer)
+
+    def apply_and_rule_1(self, element: Element, concept):
+        """
+        Apply and-rule 1: a new conjunction adds its conjuncts
+        """
+        record = self.compiled.concepts[concept]
+        if record.kind == ConceptKind.CONJUNCTION:
+            for conjunct in record.children:
+                self.add_concept(element, conjunct)
+
+    def apply_and_rule_2(self, element: Element, concept):
+        """
+        Apply and-rule 2: add the conjunctions containing the new concept whose other
+        conjuncts are already in the element
+        """
+        for conjunction in self.compiled.conjunctions_with.get(concept, ()):
+            if all(element.has_concept(conjunct) for conjunct in self.compiled.concepts[conjunction].children):
+                self.add_concept(element, conjunction)
+
+    def apply_exist_rule_1(self, element: Element, concept):
+        """
+        Apply existential rule 1: a new ∃r.C gets an r-successor for C. The element that was
+        created for C is reused if there is one, otherwise a new element is created.
+        """
+        record = self.compiled.concepts[concept]
+        if record.kind != ConceptKind.EXISTENTIAL:
+            return
+        filler = record.children[0]
+
+        successor = self.world.get_element_by_concept(filler)
+        if successor is None:
+            successor = self.create_element(filler)
+
+        self.add_edge(element, record.role, successor)
+
+    def apply_exist_rule_2(self, element: Element, concept):
+        """
+        Apply existential rule 2: a new concept C on an r-successor adds ∃r.C to its predecessors.
+        Only the roles r for which ∃r.C occurs in the ontology are looked at. ∃r.C is also
+        recorded in the image of the element, which edges added later are propagated from.
+        """
+        existentials = self.compiled.existentials_with.get(concept)
+        if not existentials:
+            return
+        image = self.images.get(element)
+        if image is None:
+            image = self.images[element] = {}
+        for role, existential in existentials.items():
+            image.setdefault(role, []).append(existential)
+            # Adding concepts does not change any edges, so the set can be iterated directly
+            for predecessor in element.get_predecessors(role):
+                if existential not in predecessor.concepts:
+                    self.add_concept(predecessor, existential)
+
+    def apply_edge_rule(self, element: Element, role, successor: Element):
+        """
+        Apply existential rule 2 for a new edge: add ∃role.C to the element for every concept C
+        of the successor for which ∃role.C occurs in the ontology. These are exactly the entries
+        of the successor's image for the role, so no concept without such an existential is
+        looked at. Concepts of the successor that are still queued reach the element through
+        apply_exist_rule_2 once they are processed.
+        """
+        image = self.images.get(successor)
+        if image is None:
+            return
+        concepts = element.concepts
+        for existential in image.get(role, ()):
+            if existential not in concepts:
+                self.add_concept(element, existential)
+
+    # ---- Incremental changes to the TBox ----
+
+    def add_gci(self, lhs, rhs):
+        """
+        Add the GCI lhs ⊑ rhs to the TBox of a saturated model and derive only its new consequences.
+        lhs and rhs may be concepts that were interned after the model was saturated.
+
+        :param lhs: Concept ID of the subsumee
+        :param rhs: Concept ID of the subsumer
+        """
+        self.compiled.add_gci(lhs, rhs)
+        self.apply_new_concepts()
+        for element in self.world.elements:
+            if element.has_concept(lhs):
+                self.add_concept(element, rhs)
+        self.run()
+
+    def add_equivalence(self, a, b):
+        """
+        Add the equivalence a ≡ b as two GCIs.
+        """
+        self.add_gci(a, b)
+        self.add_gci(b, a)
+
+    def remove_gci(self, lhs, rhs):
+        """
+        Remove the GCI lhs ⊑ rhs from the TBox of a saturated model (delete and rederive).
+        Only the elements whose concepts can depend on the GCI, i.e. the elements containing
+        lhs and everything that reaches them over edges, are reset and saturated again.
+
+        :param lhs: Concept ID of the subsumee
+        :param rhs: Concept ID of the subsumer
+        """
+        if not self.compiled.remove_gci(lhs, rhs):
+            return
+
+        affected = {element for element in self.world.elements if element.has_concept(lhs)}
+        pending = list(affected)
+        while pending:
+            for predecessors in pending.pop().predecessors.values():
+                for predecessor in predecessors:
+                    if predecessor not in affected:
+                        affected.add(predecessor)
+                        pending.append(predecessor)
+
+        for element in affected:
+            self.reset_element(element)
+        self.run()
+
+    def remove_equivalence(self, a, b):
+        """
+        Remove the equivalence a ≡ b, i.e. both of its GCIs.
+        """
+        self.remove_gci(a, b)
+        self.remove_gci(b, a)
+
+    def reset_element(self, element: Element):
+        """
+        Drop everything derived for an element, keep only its initial concept and queue that again.
+        """
+        initial = element.initial_concept
+        for role, successors in element.connections.items():
+            for successor in successors:
+                successor.predecessors[role].discard(element)
+        element.connections.clear()
+        element.concepts.clear()
+        self.images.pop(element, None)
+        self.add_initial_concept(element, initial)
+        self.apply_t_rule(element)
+
+    def apply_new_concepts(self):
+        """
+        Apply and-rule 2 and existential rule 2 for concepts interned since the last call.
+        Later facts find them through the indexes, but facts already in the model were
+        processed before these concepts existed.
+        """
+        concepts = self.compiled.concepts
+        for concept in concepts[self.known_concepts:]:
+            if concept.kind == ConceptKind.CONJUNCTION:
+                for element in self.world.elements:
+                    if all(element.has_concept(conjunct) for conjunct in concept.children):
+                        self.add_concept(element, concept.id)
+            elif concept.kind == ConceptKind.EXISTENTIAL:
+                for element in self.world.elements:
+                    if element.has_concept(concept.children[0]):
+                        self.images.setdefault(element, {}).setdefault(concept.role, []).append(concept.id)
+                        for predecessor in list(element.get_predecessors(concept.role)):
+                            self.add_concept(predecessor, concept.id)
+        self.known_concepts = len(concepts)
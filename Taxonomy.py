@@ -0,0 +1,97 @@
+import json
+
+
+class Taxonomy:
+    def __init__(self, subsumer_map):
+        """
+        Build the class hierarchy from the output of classify: names that subsume each other
+        are grouped into one node, and every node gets its direct parents and children.
+
+        The transitive reduction works on one integer bitset of strict subsumers per node.
+        The candidates of a node are visited from most to least specific (a strict subsumer
+        always has fewer subsumers itself), and a candidate is a direct parent unless an
+        earlier direct parent already covers it.
+
+        :param subsumer_map: Dictionary from every class name to the names subsuming it, including itself
+        """
+        subsumer_sets = {name: set(subsumers) for name, subsumers in subsumer_map.items()}
+        position = {name: index for index, name in enumerate(subsumer_map)}
+
+        self.nodes = []  # Groups of equivalent names, in the order of subsumer_map
+        self.node_of = {}  # Name -> index of its node
+        for name, subsumers in subsumer_map.items():
+            if name in self.node_of:
+                continue
+            members = sorted((other for other in subsumers if name in subsumer_sets.get(other, ())),
+                             key=position.get)
+            if name not in members:
+                members.insert(0, name)
+            for member in members:
+                self.node_of[member] = len(self.nodes)
+            self.nodes.append(members)
+
+        strict = []
+        for index, members in enumerate(self.nodes):
+            bits = 0
+            for subsumer in subsumer_map[members[0]]:
+                node = self.node_of.get(subsumer, index)
+                if node != index:
+                    bits |= 1 << node
+            strict.append(bits)
+        depth = [bin(bits).count("1") for bits in strict]
+
+        self.parents = [[] for _ in self.nodes]
+        self.children = [[] for _ in self.nodes]
+        for index, bits in enumerate(strict):
+            candidates = []
+            while bits:
+                lowest = bits & -bits
+                candidates.append(lowest.bit_length() - 1)
+                bits ^= lowest
+            covered = 0
+            for candidate in sorted(candidates, key=lambda node: -depth[node]):
+                if not covered >> candidate & 1:
+                    self.parents[index].append(candidate)
+                    covered |= strict[candidate]
+            self.parents[index].sort()
+            for parent in self.parents[index]:
+                self.children[parent].append(index)
+
+    def roots(self):
+        """
+        Return the indices of the nodes without parents.
+        """
+        return [index for index, parents in enumerate(self.parents) if not parents]
+
+    def to_adjacency(self):
+        """
+        Format the taxonomy as one line per node: its equivalent names joined by " = ",
+        a colon, and the first name of every direct parent.
+
+        :return: List of lines
+        """
+        lines = []
+        for members, parents in zip(self.nodes, self.parents):
+            line = " = ".join(members) + ":"
+            if parents:
+                line += " " + " ".join(self.nodes[parent][0] for parent in parents)
+            lines.append(line)
+        return lines
+
+    def to_json(self):
+        """
+        Format the taxonomy as JSON: a list of nodes with their equivalent names and the
+        first name of every direct parent and child.
+
+        :return: JSON string
+        """
+        return json.dumps([{"names": members,
+                            "parents": [self.nodes[parent][0] for parent in parents],
+                            "children": [self.nodes[child][0] for child in children]}
+                           for members, parents, children in zip(self.nodes, self.parents, self.children)])
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return f"Taxonomy(nodes={len(self.nodes)}, roots={len(self.roots())})"
@@ -1,4 +1,6 @@
 class Element:
+    __slots__ = ("name", "concepts", "connections", "predecessors")
+    
     def __init__(self, name):
         """
         Initialize an Element with a name and its associated concepts.
@@ -6,14 +8,16 @@ class Element:
         :param name: Unique identifier for the element
         """
         self.name = name
-        self.concepts = []  # Changed from set to list
+        self.concepts = {}  # Used as an ordered set: hashed membership, insertion order for output
         self.connections = {}  # Stores named, directed connections to other elements
+        self.predecessors = {}  # The same connections in reverse: relation name -> elements pointing here
     
     def add_concept(self, *concepts):
         """
-        Add one or more concepts to the element's list of concepts.
+        Add one or more concepts to the element's concepts.
         
         :param concepts: One or more concepts or a list of concepts to be added
+        :return: True if at least one of the concepts was new
         """
         # Flatten the input in case a list is passed
         flat_concepts = []
@@ -24,18 +28,36 @@ class Element:
                 flat_concepts.append(concept)
         
         # Add concepts while preventing duplicates
+        added = False
         for concept in flat_concepts:
             if concept not in self.concepts:
-                self.concepts.append(concept)
+                self.concepts[concept] = None
+                added = True
+        return added
+    
+    def has_concept(self, concept):
+        """
+        Check whether the element has a concept.
+        
+        :param concept: Concept to look for
+        :return: True if the concept was added to the element
+        """
+        return concept in self.concepts
+    
+    @property
+    def initial_concept(self):
+        """
+        The first concept added to the element, i.e. the concept it was created for.
+        """
+        return next(iter(self.concepts), None)
     
     def remove_concept(self, concept):
         """
-        Remove a concept from the element's list of concepts.
+        Remove a concept from the element's concepts.
         
         :param concept: Concept to be removed
         """
-        if concept in self.concepts:
-            self.concepts.remove(concept)
+        self.concepts.pop(concept, None)
     
     def connect_to(self, other_element, relation_name):
         """
@@ -47,6 +69,7 @@ class Element:
         if relation_name not in self.connections:
             self.connections[relation_name] = set()
         self.connections[relation_name].add(other_element)
+        other_element.predecessors.setdefault(relation_name, set()).add(self)
     
     def get_connections(self, relation_name=None):
         """
@@ -55,37 +78,55 @@ class Element:
         :param relation_name: Optional specific relation to filter by
         :return: Set of connected elements
         """
-        if relation_name:
+        if relation_name is not None:
             return self.connections.get(relation_name, set())
         return set(elem for connection_set in self.connections.values() for elem in connection_set)
     
+    def get_predecessors(self, relation_name):
+        """
+        Retrieve the elements connected to this element with a specific relation name.
+        
+        :param relation_name: Name of the relation
+        :return: Set of elements that have this element as successor
+        """
+        return self.predecessors.get(relation_name, set())
+    
     def __repr__(self):
         """
         String representation of the Element.
         
         :return: Detailed string describing the element
         """
+        connections = {relation: [e.name for e in elements] for relation, elements in self.connections.items()}
         return (f"Element(name={self.name}, "
-                f"concepts={self.concepts}, "
-                f"connections={self.connections})")
+                f"concepts={list(self.concepts)}, "
+                f"connections={connections})")
 
 
 class World:
+    __slots__ = ("elements", "elements_by_name", "elements_by_concept")
+    
     def __init__(self):
         """
-        Initialize a World with an empty list of elements.
+        Initialize a World with no elements.
         """
-        self.elements = []
+        self.elements = []  # In the order they were added
+        self.elements_by_name = {}  # Name -> element
+        self.elements_by_concept = {}  # Initial concept -> first element created for it
     
     def add_element(self, element):
         """
-        Add an element to the world.
+        Add an element to the world. The element becomes the canonical element of its
+        initial concept, unless another element was already added for that concept.
         
         :param element: Element to be added
         """
         # Prevent duplicate elements
-        if element not in self.elements:
+        if element.name not in self.elements_by_name:
             self.elements.append(element)
+            self.elements_by_name[element.name] = element
+            if element.initial_concept is not None:
+                self.elements_by_concept.setdefault(element.initial_concept, element)
     
     def remove_element(self, element):
         """
@@ -93,8 +134,11 @@ class World:
         
         :param element: Element to be removed
         """
-        if element in self.elements:
+        if self.elements_by_name.get(element.name) is element:
             self.elements.remove(element)
+            del self.elements_by_name[element.name]
+            if self.elements_by_concept.get(element.initial_concept) is element:
+                del self.elements_by_concept[element.initial_concept]
     
     def get_element_by_name(self, name):
         """
@@ -103,10 +147,16 @@ class World:
         :param name: Name of the element to find
         :return: Element with the given name, or None if not found
         """
-        for element in self.elements:
-            if element.name == name:
-                return element
-        return None
+        return self.elements_by_name.get(name)
+    
+    def get_element_by_concept(self, concept):
+        """
+        Find the canonical element of a concept, i.e. the element that was created for it.
+        
+        :param concept: Initial concept of the element to find
+        :return: Element created for the concept, or None if not found
+        """
+        return self.elements_by_concept.get(concept)
     
     def __repr__(self):
         """
@@ -114,4 +164,4 @@ class World:
         
         :return: Detailed string describing the world's elements
         """
-        return f"World(elements={self.elements})"
\ No newline at end of file
+        return f"World(elements={self.elements})"
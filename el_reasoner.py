@@ -1,16 +1,26 @@
+import os
+import json
 import sys
 import random
-import itertools
-from World import World, Element
-from py4j.java_gateway import JavaGateway  # type: ignore
-
-# Initialize the Java Gateway connection
-gateway = JavaGateway()
-
-# Get necessary components from the gateway
-parser = gateway.getOWLParser()
-formatter = gateway.getSimpleDLFormatter()
-elFactory = gateway.getELFactory()
+import shlex
+import tempfile
+import multiprocessing
+import argparse
+import contextlib
+import socketserver
+import xml.etree.ElementTree as ET
+from CompiledTBox import CompiledTBox
+from OntologyCache import OntologyCache, DiskCache
+from Reasoner import Reasoner
+from OWLLoader import OWLLoader, LOADER_VERSION, short_form
+from Taxonomy import Taxonomy
+from Instrumentation import Instrumentation
+
+# Java Gateway connection and its components, set up by connect_gateway on first use
+gateway = None
+parser = None
+formatter = None
+elFactory = None
 
 random.seed(60)
 
@@ -20,74 +30,331 @@ tbox = None
 axioms = None
 allConcepts = None
 conceptNames = None
+compiled = None
+diskCache = None
+useNativeLoader = False
+backend = "worklist"
+useModules = True
+collapseEquivalences = True
+instrumentation = None
+resultCacheSize = 1024
+classifyReasoner = None  # Reasoner of a classify_parallel worker process, kept across its chunks
 
 def main():
-    # Validate the input
-    if len(sys.argv) != 3:
-        print("Usage: PROGRAM_NAME ONTOLOGY_FILE CLASS_NAME")
+    # Parse and validate the arguments
+    arg_parser = argparse.ArgumentParser(
+        usage="%(prog)s [--native] [--backend {worklist,matrix}] [--classify [--jobs N]] ONTOLOGY_FILE [CLASS_NAME]\n"
+              "       %(prog)s [--native] [--backend {worklist,matrix}] --taxonomy [--format {adjacency,json}] ONTOLOGY_FILE\n"
+              "       %(prog)s [--native] --subsumed-by SUPER_CLASS ONTOLOGY_FILE CLASS_NAME\n"
+              "       %(prog)s [--native] [--backend {worklist,matrix}] --serve [--socket PATH] [--cache-size SIZE] [--result-cache N]")
+    arg_parser.add_argument("ontology_file", metavar="ONTOLOGY_FILE", nargs="?")
+    arg_parser.add_argument("class_name", metavar="CLASS_NAME", nargs="?")
+    arg_parser.add_argument("--classify", action="store_true",
+                            help="print the subsumers of every concept name instead of a single class")
+    arg_parser.add_argument("--taxonomy", action="store_true",
+                            help="like --classify, but print the direct parents of every group of equivalent names")
+    arg_parser.add_argument("--format", choices=["adjacency", "json"], default="adjacency",
+                            help="output format of --taxonomy (default: %(default)s)")
+    arg_parser.add_argument("--serve", action="store_true",
+                            help="answer 'ONTOLOGY_FILE CLASS_NAME' queries line by line, on stdin or --socket")
+    arg_parser.add_argument("--socket", metavar="PATH",
+                            help="listen on this Unix socket instead of stdin in --serve mode")
+    arg_parser.add_argument("--cache-size", type=int, default=1000000,
+                            help="maximum total size of the ontologies kept in memory by --serve: their concepts and "
+                                 "axioms plus the elements and facts of their models and cached answers")
+    arg_parser.add_argument("--result-cache", type=int, default=1024, metavar="N",
+                            help="number of answered classes per ontology kept in memory by --serve (default: %(default)s)")
+    arg_parser.add_argument("--cache-dir", default=DiskCache.default_dir(),
+                            help="directory for compiled ontologies, keyed by file content (default: %(default)s)")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="neither read nor write compiled ontologies on disk")
+    arg_parser.add_argument("--native", action="store_true",
+                            help="load the ontology with the pure-Python OWL loader instead of the Java gateway")
+    arg_parser.add_argument("--backend", choices=["worklist", "matrix"], default="worklist",
+                            help="saturation engine; matrix runs the rules as scipy sparse matrix operations")
+    arg_parser.add_argument("--no-module", action="store_true",
+                            help="saturate the whole TBox for a single query instead of the query's module")
+    arg_parser.add_argument("--no-collapse", action="store_true",
+                            help="do not merge concept names that are equivalent by told subsumptions before saturating")
+    arg_parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                            help="split --classify over N worker processes")
+    arg_parser.add_argument("--stats", metavar="FILE",
+                            help="write rule counts, times, py4j calls, elements and rounds as JSON to FILE "
+                                 "('-' for stderr); with --jobs only the main process is counted")
+    arg_parser.add_argument("--subsumed-by", metavar="SUPER_CLASS",
+                            help="only check whether CLASS_NAME is subsumed by SUPER_CLASS and print True or False")
+    args = arg_parser.parse_args()
+    if args.taxonomy:
+        args.classify = True
+
+    global diskCache, useNativeLoader, backend, useModules, collapseEquivalences, instrumentation, resultCacheSize
+    useNativeLoader = args.native
+    backend = args.backend
+    useModules = not args.no_module
+    collapseEquivalences = not args.no_collapse
+    resultCacheSize = args.result_cache
+    if backend == "matrix":
+        try:
+            import numpy  # type: ignore
+            import scipy.sparse  # type: ignore
+        except ImportError:
+            arg_parser.error("--backend matrix requires numpy and scipy")
+    if not args.no_cache:
+        diskCache = DiskCache(args.cache_dir, f"{'native' if useNativeLoader else 'jvm'}{LOADER_VERSION}")
+    if args.stats is not None:
+        instrumentation = Instrumentation(callback=lambda report: write_stats(report, args.stats))
+
+    if args.serve:
+        if args.ontology_file is not None or args.classify:
+            arg_parser.error("--serve takes no ONTOLOGY_FILE, CLASS_NAME or --classify")
+        serve(OntologyCache(args.cache_size), args.socket)
+        if instrumentation is not None:
+            instrumentation.finish()
+        return
+
+    if args.ontology_file is None or args.classify == (args.class_name is not None):
+        arg_parser.error("give an ONTOLOGY_FILE and either a CLASS_NAME or --classify")
+    if args.jobs < 1:
+        arg_parser.error("--jobs must be at least 1")
+    if args.subsumed_by is not None and args.classify:
+        arg_parser.error("--subsumed-by needs a CLASS_NAME, not --classify")
+
+    with phase("load"):
+        loaded = process_ontology(args.ontology_file, args.class_name)
+    if not loaded:
         sys.exit(1)
 
-    # Parse the arguments
-    ontology_file = sys.argv[1]
-    class_name = sys.argv[2]
+    with phase("saturate"):
+        if args.subsumed_by is not None:
+            if compiled.name_id(args.subsumed_by) is None:
+                print(f"--Input Error: {args.subsumed_by} does not exist in ontology: {args.ontology_file}")
+                sys.exit(1)
+            print(is_subsumed(compiled, args.class_name, args.subsumed_by))
+        elif args.classify:
+            subsumer_map = classify() if args.jobs == 1 else classify_parallel(args.jobs)
+            if args.taxonomy:
+                print_taxonomy(subsumer_map, args.format)
+            else:
+                for name, subsumers in subsumer_map.items():
+                    print(f"{compiled.concepts[name].label}: "
+                          f"{' '.join(compiled.concepts[subsumer].label for subsumer in subsumers)}")
+        else:
+            apply_el_alorithm(args.class_name)
 
-    process_ontology(ontology_file, class_name)
+    if instrumentation is not None:
+        instrumentation.finish()
 
-    apply_el_alorithm(class_name)
+def phase(name):
+    """
+    Time a phase with the instrumentation, if it is switched on.
+    """
+    if instrumentation is None:
+        return contextlib.nullcontext()
+    return instrumentation.phase(name)
+
+def write_stats(report, stats_file):
+    """
+    Write an instrumentation report as JSON to a file, or to stderr for "-".
+    """
+    text = json.dumps(report, indent=1)
+    if stats_file == "-":
+        print(text, file=sys.stderr)
+    else:
+        with open(stats_file, "w") as file:
+            print(text, file=file)
 
 def apply_el_alorithm(class_name):
-    # Start with one subsumer. Later just do a for loop that iterates over all conceptNames
-    # subsumerStr = formatter.format(random.choice(conceptNames))
-    conceptNames = ontology.getConceptNames()
-    subsumee = elFactory.getConceptName(class_name)
-    subsumer = elFactory.getConceptName("Protein")
-    # transform each equivalence axioms to two subsumptions
-    remove_alc_axioms()
-    remove_equivalence_axioms()
-
-    world = World()
-    init_element = Element(0)
-    init_element.add_concept(subsumee)
-    world.add_element(init_element)
-
-    changed = True
-    while changed:
-        changed = False
-        for el in world.elements:
-            sub_changed = apply_sub_rule(el)
-            and1_changed = apply_and_rule_1(el)
-            exist1_changed = apply_exist_rule_1(world, el)
-            and2_changed = apply_and_rule_2(el)
-            exist2_changed = apply_exist_rule_2(el)
-            t_changed = apply_t_rule(el)
-
-            changed = changed or sub_changed or and1_changed or exist1_changed or \
-                    and2_changed or exist2_changed or t_changed
-        
-    for subsumer in conceptNames:
-        if subsumer in init_element.concepts:
-            print(f"{formatter.format(subsumer)}")
-            # Satisifed
+    for subsumer in compute_subsumers(compiled, class_name):
+        print(compiled.concepts[subsumer].label)
 
-    
-    # TO-DO: -> Check that only concepts from the input are assigned 
-
-    # sampleWorld = World()
-    # element0 = Element(0)
-    # element0.add_concept(random.sample(allConcepts, 10))
-    # sampleWorld.add_element(element0)
-
-    # apply_t_rule(sampleWorld, element0)
-    # apply_and_rule_1(sampleWorld, element0)
-    # #print(f"Num Concepts before: {len(element0.concepts)}")
-    # apply_and_rule_2(element0)
-    # #print(f"Num Concepts after: {len(element0.concepts)}")
-    # apply_exist_rule_1(sampleWorld, element0)
-    # print(f"\nWorld after:\n{sampleWorld}\n")
-    # print("-----")
-    # apply_exist_rule_2(sampleWorld, element0)
-    # print("-----")
-    # apply_sub_rule(sampleWorld, element0)
+def compute_subsumers(compiled_tbox, class_name):
+    """
+    Saturate a single class and return its subsuming concept names.
+    All rules work on the compiled TBox, so the saturation never calls into the JVM.
+    With useModules only the reachability module of the class is saturated.
+
+    :param compiled_tbox: CompiledTBox the class belongs to
+    :param class_name: Name of the class
+    :return: IDs of the subsuming concept names, in ontology order
+    """
+    return new_reasoner(compiled_tbox, useModules).subsumer_ids(class_name)
+
+def compute_name_subsumers(compiled_tbox, names):
+    """
+    Saturate the given concept names in one shared model and return their subsuming concept names.
+
+    :param compiled_tbox: CompiledTBox the names belong to
+    :param names: IDs of the concept names
+    :return: Dictionary from each of the names to the IDs of its subsuming concept names, in ontology order
+    """
+    return new_reasoner(compiled_tbox, False).classify(names)
+
+def is_subsumed(compiled_tbox, sub_name, super_name):
+    """
+    Check a single subsumption sub_name ⊑ super_name without computing all subsumers,
+    see Reasoner.subsumes.
+
+    :param compiled_tbox: CompiledTBox both classes belong to
+    :param sub_name: Name of the subsumee
+    :param super_name: Name of the subsumer
+    :return: True if sub_name is subsumed by super_name
+    """
+    return new_reasoner(compiled_tbox, useModules).subsumes(super_name, sub_name)
+
+def new_reasoner(compiled_tbox, use_modules, cache_size=0, max_elements=100000):
+    """
+    Create a Reasoner over a compiled TBox with the settings of the command line.
+    """
+    return Reasoner(compiled_tbox, backend, use_modules, collapseEquivalences, cache_size, max_elements,
+                    instrumentation=instrumentation)
+
+def serve(cache, socket_path=None):
+    """
+    Run as a long-lived reasoner that keeps the gateway connected and the compiled
+    ontologies in memory. Each request line is "ONTOLOGY_FILE CLASS_NAME" (shell-quoted
+    if needed); the answer is one subsumer per line, followed by an empty line.
+    A request "ONTOLOGY_FILE CLASS_NAME SUPER_CLASS" is answered with True or False.
+    Every cached ontology has its own Reasoner, which keeps the answers and one shared
+    model, so later queries about the same ontology reuse the elements of earlier ones.
+
+    :param cache: OntologyCache holding a Reasoner per ontology
+    :param socket_path: Path of a Unix socket to listen on, stdin/stdout if None
+    """
+    if socket_path is None:
+        for line in sys.stdin:
+            for answer_line in answer_query(cache, line):
+                print(answer_line)
+            print(flush=True)
+        return
+
+    class QueryHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                answer = answer_query(cache, line.decode("utf-8"))
+                self.wfile.write("".join(answer_line + "\n" for answer_line in answer).encode("utf-8") + b"\n")
+
+    with socketserver.UnixStreamServer(socket_path, QueryHandler) as server:
+        server.serve_forever()
+
+def answer_query(cache, line):
+    """
+    Answer one request line of the server mode.
+
+    :param cache: OntologyCache holding a Reasoner per ontology
+    :param line: Request line "ONTOLOGY_FILE CLASS_NAME [SUPER_CLASS]"
+    :return: List of output lines (without the terminating empty line)
+    """
+    try:
+        args = shlex.split(line)
+    except ValueError as e:
+        return [f"--Input Error: {e}"]
+    if not args:
+        return []
+    if len(args) not in (2, 3):
+        return ["--Input Error: expected ONTOLOGY_FILE CLASS_NAME [SUPER_CLASS]"]
+    ontology_file, class_name = args[:2]
+
+    if not os.path.isfile(ontology_file):
+        return [f"--Input Error: no such ontology file: {ontology_file}"]
+
+    reasoner = cache.get(ontology_file)
+    if reasoner is None:
+        compiled_tbox = load_compiled(ontology_file)
+        if compiled_tbox is None:
+            return [f"--Input Error: could not load ontology: {ontology_file}"]
+        # A shared model with more elements than the whole cache may hold is started over
+        reasoner = new_reasoner(compiled_tbox, False, resultCacheSize, cache.max_size)
+        cache.put(ontology_file, reasoner)
+
+    for name in args[1:]:
+        if reasoner.compiled.name_id(name) is None:
+            return [f"--Input Error: {name} does not exist in ontology: {ontology_file}"]
+    if len(args) == 3:
+        answer = [str(reasoner.subsumes(args[2], class_name))]
+    else:
+        answer = reasoner.subsumers(class_name)
+    # The query may have added elements and an answer to the reasoner
+    cache.refresh(ontology_file)
+    return answer
+
+def classify(names=None):
+    """
+    Compute the subsumers of all concept names in one shared model.
+    Every concept name gets its own element, which existential rule 1 also reuses as
+    successor, so each name is only saturated once.
+
+    :param names: IDs of the concept names to classify, all concept names by default
+    :return: Dictionary from concept name ID to the IDs of its subsuming concept names
+    """
+    if names is None:
+        names = compiled.names
+    return compute_name_subsumers(compiled, names)
+
+def print_taxonomy(subsumer_map, output_format):
+    """
+    Print the class hierarchy computed from the subsumers of all concept names.
+
+    :param subsumer_map: Result of classify or classify_parallel
+    :param output_format: "adjacency" for one line per group of equivalent names, or "json"
+    """
+    taxonomy = Taxonomy({compiled.concepts[name].label: [compiled.concepts[subsumer].label for subsumer in subsumers]
+                         for name, subsumers in subsumer_map.items()})
+    if output_format == "json":
+        print(taxonomy.to_json())
+    else:
+        for line in taxonomy.to_adjacency():
+            print(line)
+
+def classify_parallel(jobs):
+    """
+    Classify all concept names with a pool of worker processes.
+    The compiled TBox is written to a temporary file once, and every worker loads its own
+    copy from there, so no worker parses the ontology or talks to the JVM. Every worker
+    keeps one Reasoner, whose shared model also serves the existential fillers the names
+    of different chunks have in common.
+
+    :param jobs: Number of worker processes
+    :return: Dictionary from concept name ID to the IDs of its subsuming concept names
+    """
+    fd, tbox_path = tempfile.mkstemp(suffix=".eltbox")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            compiled.save(file)
+
+        # One chunk per worker, interleaved, so one expensive region of the ontology does
+        # not end up with a single worker; more chunks would saturate the fillers they
+        # share once per chunk and worker
+        chunks = [compiled.names[i::jobs] for i in range(jobs)]
+
+        subsumer_map = {}
+        with multiprocessing.Pool(jobs, initializer=init_classify_worker,
+                                  initargs=(tbox_path, backend, collapseEquivalences)) as pool:
+            for part in pool.imap_unordered(classify_chunk, [chunk for chunk in chunks if chunk]):
+                subsumer_map.update(part)
+    finally:
+        os.remove(tbox_path)
+
+    return {name: subsumer_map[name] for name in compiled.names}
+
+def init_classify_worker(tbox_path, backend_name, collapse):
+    """
+    Set up a worker process of classify_parallel with its copy of the compiled TBox and its Reasoner.
+    """
+    global compiled, backend, collapseEquivalences, classifyReasoner
+    backend = backend_name
+    collapseEquivalences = collapse
+    with open(tbox_path, "rb") as file:
+        compiled = CompiledTBox.load(file)
+    classifyReasoner = new_reasoner(compiled, False)
+
+def classify_chunk(names):
+    """
+    Classify a chunk of the concept names in a worker process of classify_parallel.
+
+    :param names: IDs of the concept names
+    :return: Dictionary from each of the names to the IDs of its subsuming concept names
+    """
+    return classifyReasoner.classify(names)
 
 def remove_alc_axioms():
    global allConcepts, axioms
@@ -120,189 +387,6 @@ def remove_alc_axioms():
            
    axioms = filtered_axioms
 
-def apply_t_rule(element: Element):
-    """
-    Apply T-rule for an element by adding the top concept
-    
-    :param world: The world containing all elements
-    :param element: The element to apply the rule to
-    """
-    alteredInterpretation = False
-    # Create the top concept using elFactory
-    top_concept = elFactory.getTop()
-    
-    if top_concept not in element.concepts:
-        # print(f"Adding top concept: {formatter.format(top_concept)}")
-        element.add_concept(top_concept)
-        alteredInterpretation = True
-
-    return alteredInterpretation 
-
-def apply_and_rule_1(element: Element):
-    alteredInterpretation = False
-    concepts = element.concepts
-
-    for concept in concepts:
-        conceptType = concept.getClass().getSimpleName()
-        if conceptType == "ConceptConjunction":
-            # print(formatter.format(concept))
-            conjuncts = concept.getConjuncts()
-            if len(conjuncts) != 2:
-                print("And-Rule-1 Conjunction Error")
-                continue
-
-            newConceptA = conjuncts[0]
-            newConceptB = conjuncts[1]
-
-            element.concepts.append(newConceptA)
-            element.concepts.append(newConceptB)
-            alteredInterpretation = True
-
-    return alteredInterpretation
-
-def apply_and_rule_2(element: Element):
-    alteredInterpretation = False
-    concepts = element.concepts
-    
-    # Generate all unique combinations of 2 concepts
-    # itertools.combinations ensures no repeated pairs and no (a,a) combinations
-    for a, b in itertools.combinations(concepts, 2):
-        conjunction = elFactory.getConjunction(a, b)
-        
-        # Check if conjunction is in allConcepts
-        if conjunction in allConcepts:
-            # print(f"Adding conjunction: {formatter.format(conjunction)}")
-            element.add_concept(conjunction)
-            alteredInterpretation = True
-
-    return alteredInterpretation
-
-def apply_exist_rule_1(world: World, element: Element):
-    """
-    Apply existential rule 1 for an element
-    
-    :param world: The world containing all elements
-    :param element: The element to apply the rule to
-    """
-    #print(f"World before:\n{world}\n")
-    alteredInterpretation = False
-    concepts = element.concepts
-
-    for concept in concepts:
-        conceptType = concept.getClass().getSimpleName()
-        
-        # Check if the concept is an existential role restriction
-        if conceptType == "ExistentialRoleRestriction":
-            role = concept.role()
-            filler = concept.filler()
-            
-            # Print debug information
-            # print("Found existential role restriction: " + formatter.format(concept))
-            # print("Role: " + formatter.format(role))
-            # print("Filler: " + formatter.format(filler))
-            
-            # Check if this role already has successors
-            role_str = formatter.format(role)
-            if role_str not in element.connections:
-                element.connections[role_str] = set()
-            
-            # Check existing successors for the role
-            for successor in element.connections.get(role_str, set()):
-                # Check if the filler concept is in any of the successor's concepts
-                if successor.concepts and filler in successor.concepts:
-                    # print("Concept already satisifed!")
-                    return alteredInterpretation
-            
-            # Try to find an existing element with the filler as initial concept
-            matching_element = None
-            for e in world.elements:
-                if e.concepts and formatter.format(e.concepts[0]) == formatter.format(filler):
-                    matching_element = e
-                    break
-            
-            if matching_element:
-                # print("Found a matching element with correct init concept")
-                # Use existing element as successor
-                element.connect_to(matching_element, role_str)
-            else:
-                # print("Creating new element")
-                # Create a new element with the filler as initial concept
-                new_element = Element(len(world.elements))
-                new_element.add_concept(filler)
-                
-                # Add the new element to the world
-                world.add_element(new_element)
-                
-                # Connect the new element as a successor
-                element.connect_to(new_element, role_str)
-            
-            return True
-
-def apply_exist_rule_2(element: Element):
-    """
-    Apply existential rule 2 for an element
-    
-    :param world: The world containing all elements
-    :param element: The element to apply the rule to
-    """
-    alteredInterpretation = False
-    # Iterate through all roles (connection types) for this element
-    for role_str, successors in element.connections.items():
-        # Check each successor
-        for successor in successors:
-            # Iterate through all concepts of the successor
-            for concept in successor.concepts:
-                # Create an existential role restriction
-                existential_concept = elFactory.getExistentialRoleRestriction(
-                    elFactory.getRole(role_str), 
-                    concept
-                )
-                
-                # Check if the existential concept is in allConcepts
-                if existential_concept in allConcepts:
-                    # Add the concept to the element if it's not already present
-                    if existential_concept not in element.concepts:
-                        #print(f"Adding existential concept: {formatter.format(existential_concept)}")
-                        element.add_concept(existential_concept)
-                        alteredInterpretation = True
-                    
-    return alteredInterpretation
-
-def apply_sub_rule(element: Element):
-    """
-    Apply subsumption rule for an element
-    
-    :param world: The world containing all elements
-    :param element: The element to apply the rule to
-    """
-    alteredInterpretation = False
-    # Create a copy of the current concepts to iterate over
-    current_concepts = element.concepts.copy()
-    
-    for concept in current_concepts:
-        # Iterate through all axioms in the tbox
-        for axiom in axioms:
-            # Check if the axiom is a General Concept Inclusion (GCI) axiom
-            axiom_type = axiom.getClass().getSimpleName()
-            if axiom_type == "GeneralConceptInclusion":
-                # Get the subsumee and subsumer of the axiom
-                subsumee = axiom.lhs()
-                subsumer = axiom.rhs()
-                #print(f"Concept: {formatter.format(concept)}, Subsumee: {formatter.format(subsumee)}")
-                
-                # Check if the current concept matches the subsumee
-                if concept == subsumee:
-                    # Check if the subsumer is in allConcepts to ensure validity
-                    if subsumer in allConcepts:
-                        # Add the subsumer to the element if not already present
-                        if subsumer not in element.concepts:
-                            # print(f"Adding subsumer: {formatter.format(subsumer)} "
-                            #       f"for concept: {formatter.format(concept)}")
-                            element.add_concept(subsumer)
-                            alteredInterpretation = True
-    
-    return alteredInterpretation
-
 def remove_equivalence_axioms():
     global axioms
     newAxioms = []
@@ -337,41 +421,243 @@ def remove_equivalence_axioms():
 def process_ontology(ontology_file, class_name):
     """
     Process the ontology file and perform actions related to the class name.
-    """
-    global conceptNames
 
+    :param class_name: Name of the queried class, or None to skip the check
+    :return: True if the ontology was loaded and contains the class name
+    """
     #print(f"Processing ontology file '{ontology_file}' for class '{class_name}'.")
     
-    # Load the ontology
-    load_ontology(ontology_file)
+    # Load and compile the ontology
+    if load_compiled(ontology_file) is None:
+        return False
 
     # Validate if the class name exists in the ontology
-    if conceptNames is None or elFactory.getConceptName(class_name) not in conceptNames:
+    if class_name is not None and compiled.name_id(class_name) is None:
         print(f"--Input Error: {class_name} does not exist in ontology: {ontology_file}")
+        return False
+
+    return True
+
+def load_compiled(ontology_file):
+    """
+    Load an ontology, reduce it to EL and compile it.
+    If the disk cache has the compiled ontology, it is read from there without using the JVM.
+    With useNativeLoader the OWLLoader is used instead of the Java gateway.
+
+    :return: The CompiledTBox (also stored in the global compiled), or None if loading failed
+    """
+    global compiled
+
+    if diskCache is not None:
+        compiled = diskCache.get(ontology_file)
+        if compiled is not None:
+            return compiled
+
+    if useNativeLoader:
+        try:
+            compiled = OWLLoader().load(ontology_file)
+        except (OSError, ValueError, ET.ParseError) as e:
+            print(f"Error loading ontology: {e}")
+            return None
+    else:
+        load_ontology(ontology_file)
+        if ontology is None:
+            return None
+
+        if not compile_ontology_bulk():
+            # Walk the ontology object by object
+            load_axioms_and_concepts()
+            if ontology is None:
+                return None
+
+            # transform each equivalence axioms to two subsumptions
+            remove_alc_axioms()
+            remove_equivalence_axioms()
+            compile_ontology()
+
+    if diskCache is not None:
+        try:
+            diskCache.put(ontology_file, compiled)
+        except OSError as e:
+            print(f"Could not write the ontology cache: {e}", file=sys.stderr)
+    return compiled
+
+def compile_ontology_bulk():
+    """
+    Compile the loaded ontology from a single formatted dump of its TBox instead of walking
+    its axioms and sub-concepts, where every getClass, lhs, rhs or getConjuncts is a
+    separate gateway round-trip. The dump is parsed by OWLLoader.load_dl_text, which drops
+    the non-EL axioms and splits the equivalences like remove_alc_axioms and
+    remove_equivalence_axioms do. Every name read from the dump must be one of the concept
+    names of the ontology (format_concept_names), otherwise the dump was not understood.
+
+    :return: True if the TBox was compiled, False if the gateway could not format the TBox
+             or the dump could not be parsed, in which case compile_ontology has to be used
+    """
+    global compiled
+    try:
+        dump = formatter.format(tbox)
+    except Exception:
+        # py4j raises a Py4JError if the formatter has no method for TBoxes
+        return False
+
+    try:
+        for one_by_one in (False, True):
+            names = format_concept_names(one_by_one)
+            loader = OWLLoader()
+            for name in names:
+                loader.compiled.intern_name(name)
+            loader.load_dl_text(dump)
+            unknown = [loader.compiled.concepts[name].label for name in loader.compiled.names[len(names):]]
+            if not unknown:
+                compiled = loader.compiled
+                return True
+        # A name in the dump is not a concept name of the ontology, e.g. part of a construct
+        # the parser does not know, so the dump was not read the way the JVM sees it
+        raise ValueError(f"Not concept names of the ontology: {', '.join(unknown)}")
+    except ValueError:
+        return False
+
+def format_concept_names(one_by_one=False):
+    """
+    Return the formatted names of all concept names of the loaded ontology. Fetching and
+    formatting them one by one takes two gateway round-trips per name, so by default the set
+    is turned into a single string by its toString on the JVM side and split here. If that
+    does not give as many distinct names as the set has, they are formatted one by one after all.
+
+    :param one_by_one: Format every name with the formatter, e.g. because the names read
+                       from the string did not match the formatted TBox
+    :return: List of names, in the iteration order of the set
+    """
+    if one_by_one:
+        return [formatter.format(name) for name in conceptNames]
+    count = conceptNames.size()
+    text = conceptNames.toString().strip()
+    if text[:1] == "[" and text[-1:] == "]":
+        text = text[1:-1]
+    names = [concept_name_label(item) for item in text.split(", ")] if text else []
+    if len(set(names)) == count and all(names):
+        return names
+    return format_concept_names(True)
+
+def concept_name_label(text):
+    """
+    Return the name of a ConceptName from its toString, e.g. "ConceptName(http://x.org/o#A)",
+    "<http://x.org/o#A>" or just the IRI, in the short form of the formatter.
+    """
+    text = text.strip()
+    if text.endswith(")") and "(" in text:
+        text = text[text.index("(") + 1:-1]
+    return short_form(text.strip("<>\""))
+
+def compile_ontology():
+    """
+    Compile the filtered concepts and axioms into a CompiledTBox.
+    This is the only place after loading that talks to the JVM; the rules only use the result.
+    """
+    global compiled
+    compiled = CompiledTBox()
+    cache = {}
+
+    for name in conceptNames:
+        compiled.intern_name(formatter.format(name))
+
+    for concept in allConcepts:
+        compile_concept(concept, cache)
+
+    for axiom in axioms:
+        if axiom.getClass().getSimpleName() == "GeneralConceptInclusion":
+            compiled.add_gci(compile_concept(axiom.lhs(), cache), compile_concept(axiom.rhs(), cache))
+
+def compile_concept(concept, cache):
+    """
+    Intern a JVM concept (and its sub-concepts) into the compiled TBox.
+
+    :param concept: py4j proxy of the concept
+    :param cache: Formatted string -> concept ID, so every concept is only walked once
+    :return: Concept ID
+    """
+    label = formatter.format(concept)
+    if label in cache:
+        return cache[label]
+
+    conceptType = concept.getClass().getSimpleName()
+    if conceptType == "ConceptName":
+        concept_id = compiled.intern_name(label)
+    elif conceptType == "TopConcept$":
+        concept_id = compiled.top
+    elif conceptType == "ConceptConjunction":
+        concept_id = compiled.intern_conjunction(
+            *[compile_concept(conjunct, cache) for conjunct in concept.getConjuncts()])
+    elif conceptType == "ExistentialRoleRestriction":
+        concept_id = compiled.intern_existential(
+            compiled.intern_role(formatter.format(concept.role())),
+            compile_concept(concept.filler(), cache))
+    else:
+        # Not an EL concept, e.g. a disjunction inside a filler; the rules treat it as an atom
+        concept_id = compiled.intern_other(label)
+
+    cache[label] = concept_id
+    return concept_id
+
+def connect_gateway():
+    """
+    Connect to the Java Gateway of dl4python, unless that already happened.
+    """
+    global gateway, parser, formatter, elFactory
+    if gateway is not None:
         return
 
+    # Imported here, so the native loader also works where py4j is not installed
+    from py4j.java_gateway import JavaGateway  # type: ignore
+
+    gateway = JavaGateway()
+    if instrumentation is not None:
+        # Every call on a py4j proxy goes through send_command of the shared gateway client
+        instrumentation.count_calls(gateway._gateway_client, "send_command", "py4j_calls")
+    parser = gateway.getOWLParser()
+    formatter = gateway.getSimpleDLFormatter()
+    elFactory = gateway.getELFactory()
+
 def load_ontology(ontology_file):
     """
     Load an ontology from a file and convert it to binary conjunctions.
+    Only the TBox and the concept names are fetched; see load_axioms_and_concepts.
     """
-    global ontology, tbox, axioms, allConcepts, conceptNames
+    global ontology, tbox, conceptNames
 
     #print(f"Loading ontology from file: {ontology_file}...")
 
+    ontology = None
     try:
+        connect_gateway()
         ontology = parser.parseFile(ontology_file)
 
         gateway.convertToBinaryConjunctions(ontology)
 
-        # Extract TBox axioms and concepts
+        # Extract the TBox and concept names; the set of names stays on the JVM side,
+        # see format_concept_names
         tbox = ontology.tbox()
+        conceptNames = ontology.getConceptNames()
+
+    except Exception as e:
+        ontology = None
+        print(f"Error loading ontology: {e}")
+
+def load_axioms_and_concepts():
+    """
+    Fetch the axioms and all sub-concepts of the loaded ontology for walking them object by object.
+    """
+    global ontology, axioms, allConcepts
+
+    try:
         axioms = list(tbox.getAxioms())
         allConcepts = list(ontology.getSubConcepts())
-        conceptNames = list(ontology.getConceptNames())
 
         # print_ontology_summary()
 
     except Exception as e:
+        ontology = None
         print(f"Error loading ontology: {e}")
 
 def print_ontology_summary():
@@ -0,0 +1,217 @@
+#! /usr/bin/python3
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+evaluatorPath = os.path.dirname(os.path.abspath(__file__))
+testDataPath = os.path.join(evaluatorPath, "TestData")
+reasonerPath = os.path.dirname(evaluatorPath)
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Time the phases of classifying ontologies with el_reasoner and write the results as JSON. "
+                    "Every ontology is run in a fresh process, so peak memory is measured per ontology.")
+    arg_parser.add_argument("ontologies", metavar="ONTOLOGY_FILE", nargs="*",
+                            help="ontologies to benchmark (default: all .owl files in TestData)")
+    arg_parser.add_argument("--native", action="store_true",
+                            help="load with the pure-Python OWL loader instead of the Java gateway")
+    arg_parser.add_argument("--backend", choices=["worklist", "matrix"], default="worklist",
+                            help="saturation engine to benchmark")
+    arg_parser.add_argument("--repeat", type=int, default=1, metavar="N",
+                            help="run every ontology N times and keep the fastest time of each phase")
+    arg_parser.add_argument("--timeout", type=float, default=600, metavar="SECONDS",
+                            help="time limit per run (default: %(default)s)")
+    arg_parser.add_argument("--output", metavar="FILE",
+                            help="write the JSON results to FILE instead of stdout")
+    arg_parser.add_argument("--compare", metavar="FILE",
+                            help="JSON results of an earlier run to compare the total times with")
+    arg_parser.add_argument("--tolerance", type=float, default=1.25,
+                            help="slowdown factor over --compare that counts as a regression (default: %(default)s)")
+    arg_parser.add_argument("--stats", action="store_true",
+                            help="also count derived facts, py4j calls and the work of every rule, "
+                                 "in one extra instrumented run that is not timed")
+    arg_parser.add_argument("--run", metavar="ONTOLOGY_FILE", help=argparse.SUPPRESS)
+    arg_parser.add_argument("--instrument", action="store_true", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.run is not None:
+        print(json.dumps(run_single(args.run, args.native, args.backend, args.instrument)))
+        return
+
+    ontologies = args.ontologies or sorted(glob.glob(os.path.join(testDataPath, "*.owl")))
+    results = [benchmark(ontology_file, args) for ontology_file in ontologies]
+
+    report = {"loader": "native" if args.native else "jvm", "backend": args.backend,
+              "repeat": args.repeat, "stats": args.stats, "results": results}
+    if args.output is None:
+        print(json.dumps(report, indent=1))
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1)
+
+    print_table(results)
+    if args.compare is not None and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+def benchmark(ontology_file, args):
+    """
+    Run one ontology args.repeat times, each time in a new process. The timed runs are not
+    instrumented, so they measure the production code path; with args.stats the counts
+    come from one more run with instrumentation.
+
+    :return: Result dictionary, see run_single; the times are the minimum over the runs
+             and the memory the maximum
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--run", os.path.abspath(ontology_file),
+               "--backend", args.backend] + (["--native"] if args.native else [])
+    runs = []
+    for _ in range(args.repeat):
+        runs.append(run_process(command, ontology_file, args.timeout))
+        if "error" in runs[-1]:
+            return runs[-1]
+
+    result = dict(runs[0])
+    for phase in ("load_s", "normalize_s", "saturate_s", "total_s"):
+        result[phase] = min(run[phase] for run in runs)
+    result["peak_rss_kb"] = max(run["peak_rss_kb"] for run in runs)
+
+    if args.stats:
+        counted = run_process(command + ["--instrument"], ontology_file, args.timeout)
+        if "error" in counted:
+            return counted
+        for key in ("derived_facts", "py4j_calls", "rules"):
+            result[key] = counted[key]
+    return result
+
+def run_process(command, ontology_file, timeout):
+    """
+    Run run_single in a new process.
+
+    :return: Its result dictionary, or a dictionary with an error
+    """
+    try:
+        completed = subprocess.run(command, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"ontology": os.path.basename(ontology_file), "error": f"timeout after {timeout}s"}
+    lines = completed.stdout.decode("utf-8").strip().split("\n")
+    try:
+        return json.loads(lines[-1])
+    except ValueError:
+        return {"ontology": os.path.basename(ontology_file),
+                "error": completed.stderr.decode("utf-8").strip() or "no result"}
+
+def run_single(ontology_file, native, backend, instrument=False):
+    """
+    Load, normalize and classify one ontology in this process.
+
+    load: parsing the ontology (JVM: up to the TBox proxy; native: the streaming OWLLoader,
+    which already reduces the ontology to EL while reading it). normalize: remove_alc_axioms,
+    remove_equivalence_axioms and compiling (JVM only). saturate: classify, including the
+    preprocessing of the compiled TBox it does itself.
+
+    :param instrument: Record the work of the rules with an Instrumentation, which makes
+                       the saturation itself considerably slower
+    :return: Result dictionary with the phase times in seconds, the peak resident set size
+             of the process, the size of the compiled TBox and the number of derived
+             subsumptions between concept names; with instrument also the number of derived
+             facts, the py4j calls and the Instrumentation counts of the rules
+    """
+    sys.path.insert(0, reasonerPath)
+    import el_reasoner
+    from OWLLoader import OWLLoader
+    from Instrumentation import Instrumentation
+
+    el_reasoner.useNativeLoader = native
+    el_reasoner.backend = backend
+    el_reasoner.instrumentation = instrumentation = Instrumentation() if instrument else None
+    result = {"ontology": os.path.basename(ontology_file)}
+
+    start = time.perf_counter()
+    if native:
+        el_reasoner.compiled = OWLLoader().load(ontology_file)
+        loaded = normalized = time.perf_counter()
+    else:
+        el_reasoner.load_ontology(ontology_file)
+        if el_reasoner.ontology is None:
+            return dict(result, error="could not load the ontology")
+        loaded = time.perf_counter()
+        if not el_reasoner.compile_ontology_bulk():
+            el_reasoner.load_axioms_and_concepts()
+            el_reasoner.remove_alc_axioms()
+            el_reasoner.remove_equivalence_axioms()
+            el_reasoner.compile_ontology()
+        normalized = time.perf_counter()
+
+    subsumer_map = el_reasoner.classify()
+    saturated = time.perf_counter()
+
+    compiled = el_reasoner.compiled
+    result.update({
+        "load_s": round(loaded - start, 6),
+        "normalize_s": round(normalized - loaded, 6),
+        "saturate_s": round(saturated - normalized, 6),
+        "total_s": round(saturated - start, 6),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "concepts": len(compiled.concepts),
+        "axioms": len(compiled.axioms),
+        "names": len(compiled.names),
+        "subsumptions": sum(len(subsumers) for subsumers in subsumer_map.values()),
+    })
+    if instrumentation is not None:
+        report = instrumentation.report()
+        result.update({
+            "derived_facts": report["counters"]["facts"],
+            "py4j_calls": report["counters"].get("py4j_calls", 0),
+            "rules": report["rules"],
+        })
+    return result
+
+def print_table(results):
+    """
+    Print the results as a table on stderr, so stdout stays valid JSON.
+    """
+    columns = ["ontology", "names", "axioms", "load_s", "normalize_s", "saturate_s", "total_s",
+               "peak_rss_kb", "subsumptions", "derived_facts"]
+    rows = [columns] + [[str(result.get(column, "-")) for column in columns]
+                        for result in results if "error" not in result]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)), file=sys.stderr)
+    for result in results:
+        if "error" in result:
+            print(f"{result['ontology']}: {result['error']}", file=sys.stderr)
+
+def compare(results, baseline_file, tolerance):
+    """
+    Compare the total times with an earlier run.
+
+    :return: True if an ontology got slower than tolerance times its baseline, or its number
+             of subsumptions changed
+    """
+    with open(baseline_file) as file:
+        baseline = {result["ontology"]: result for result in json.load(file)["results"]}
+
+    regression = False
+    for result in results:
+        old = baseline.get(result["ontology"])
+        if old is None or "error" in old or "error" in result:
+            continue
+        ratio = result["total_s"] / old["total_s"] if old["total_s"] else 1.0
+        changed = result["subsumptions"] != old["subsumptions"]
+        flag = ""
+        if changed:
+            flag = "  SUBSUMPTIONS CHANGED"
+        elif ratio > tolerance:
+            flag = "  SLOWER"
+        regression |= changed or ratio > tolerance
+        print(f"{result['ontology']}: {ratio:.2f}x of baseline{flag}", file=sys.stderr)
+    return regression
+
+if __name__ == "__main__":
+    main()
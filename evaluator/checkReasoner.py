@@ -0,0 +1,223 @@
+#! /usr/bin/python3
+
+import os
+import sys
+import random
+import argparse
+import tempfile
+
+evaluatorPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(evaluatorPath))
+
+from OWLLoader import OWLLoader
+from Reasoner import Reasoner
+from generateOntology import OntologyGenerator, compile_axioms, reference_subsumers
+
+RDF_HEADER = ('<?xml version="1.0"?>\n'
+              '<rdf:RDF xmlns="http://example.org/check#" xml:base="http://example.org/check"\n'
+              '     xmlns:owl="http://www.w3.org/2002/07/owl#"\n'
+              '     xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"\n'
+              '     xmlns:xsd="http://www.w3.org/2001/XMLSchema#"\n'
+              '     xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#">\n')
+
+# A ≡ X ⊓ ≥2 r.C and B ⊑ X ⊓ ≥2 r.D: B is not subsumed by A
+QUALIFIED_CARDINALITIES = RDF_HEADER + """
+ <owl:ObjectProperty rdf:about="http://example.org/check#r"/>
+ <owl:Class rdf:about="http://example.org/check#A">
+  <owl:equivalentClass><owl:Class><owl:intersectionOf rdf:parseType="Collection">
+   <rdf:Description rdf:about="http://example.org/check#X"/>
+   <owl:Restriction>
+    <owl:onProperty rdf:resource="http://example.org/check#r"/>
+    <owl:onClass rdf:resource="http://example.org/check#C"/>
+    <owl:minQualifiedCardinality rdf:datatype="http://www.w3.org/2001/XMLSchema#nonNegativeInteger">2</owl:minQualifiedCardinality>
+   </owl:Restriction>
+  </owl:intersectionOf></owl:Class></owl:equivalentClass>
+ </owl:Class>
+ <owl:Class rdf:about="http://example.org/check#B">
+  <rdfs:subClassOf><owl:Class><owl:intersectionOf rdf:parseType="Collection">
+   <rdf:Description rdf:about="http://example.org/check#X"/>
+   <owl:Restriction>
+    <owl:onProperty rdf:resource="http://example.org/check#r"/>
+    <owl:onClass rdf:resource="http://example.org/check#D"/>
+    <owl:minQualifiedCardinality rdf:datatype="http://www.w3.org/2001/XMLSchema#nonNegativeInteger">2</owl:minQualifiedCardinality>
+   </owl:Restriction>
+  </owl:intersectionOf></owl:Class></rdfs:subClassOf>
+ </owl:Class>
+</rdf:RDF>
+"""
+
+# A ≡ X ⊓ age=5 and B ⊑ X ⊓ age=6: B is not subsumed by A
+DATA_VALUES = """<?xml version="1.0"?>
+<Ontology xmlns="http://www.w3.org/2002/07/owl#" ontologyIRI="http://example.org/check">
+ <EquivalentClasses>
+  <Class IRI="http://example.org/check#A"/>
+  <ObjectIntersectionOf>
+   <Class IRI="http://example.org/check#X"/>
+   <DataHasValue>
+    <DataProperty IRI="http://example.org/check#age"/>
+    <Literal datatypeIRI="http://www.w3.org/2001/XMLSchema#integer">5</Literal>
+   </DataHasValue>
+  </ObjectIntersectionOf>
+ </EquivalentClasses>
+ <SubClassOf>
+  <Class IRI="http://example.org/check#B"/>
+  <ObjectIntersectionOf>
+   <Class IRI="http://example.org/check#X"/>
+   <DataHasValue>
+    <DataProperty IRI="http://example.org/check#age"/>
+    <Literal datatypeIRI="http://www.w3.org/2001/XMLSchema#integer">6</Literal>
+   </DataHasValue>
+  </ObjectIntersectionOf>
+ </SubClassOf>
+</Ontology>
+"""
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Check the reasoner on small cases with known answers. "
+                    "Prints one line per check and exits with 1 if any of them fails.")
+    arg_parser.add_argument("checks", metavar="CHECK", nargs="*", choices=[[]] + list(CHECKS),
+                            help=f"checks to run (default: all of {', '.join(CHECKS)})")
+    args = arg_parser.parse_args()
+
+    failed = False
+    for name in args.checks or CHECKS:
+        try:
+            failures = CHECKS[name]()
+        except ImportError as e:
+            # The check needs an optional dependency
+            print(f"{name}: skipped ({e})")
+            continue
+        failed |= bool(failures)
+        print(f"{name}: {'FAILED' if failures else 'ok'}")
+        for failure in failures:
+            print(f"  {failure}")
+    if failed:
+        sys.exit(1)
+
+def check_loader_labels():
+    """
+    Concepts outside of EL must only become the same atom if they are the same concept,
+    otherwise the reasoner derives subsumptions that do not hold.
+
+    :return: List of failure messages
+    """
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        for file_name, content in [("qualified.owl", QUALIFIED_CARDINALITIES), ("values.owl", DATA_VALUES)]:
+            path = os.path.join(directory, file_name)
+            with open(path, "w") as file:
+                file.write(content)
+            subsumers = Reasoner(OWLLoader().load(path)).subsumers("B")
+            if "A" in subsumers:
+                failures.append(f"{file_name}: B is subsumed by A")
+            if "X" not in subsumers:
+                failures.append(f"{file_name}: B is not subsumed by X")
+    return failures
+
+def check_dl_names():
+    """
+    Only names of the formatted TBox become concept names when it is read from DL syntax;
+    nominals and other constructs stay part of a concept outside of EL.
+
+    :return: List of failure messages
+    """
+    failures = []
+    for text, expected in [("A ⊑ ∃hasCountryOfOrigin.{Italy}", ["A"]),
+                           ("A ≡ (B ⊓ ∃r.{a, b})\nC ⊑ ∃r.(¬D)", ["A", "B", "C"])]:
+        compiled = OWLLoader().load_dl_text(text)
+        names = [compiled.concepts[name].label for name in compiled.names]
+        if names != expected:
+            failures.append(f"{text!r}: concept names {names} instead of {expected}")
+    return failures
+
+def check_incremental(seeds=40, steps=8):
+    """
+    Add and remove random GCIs through Reasoner.add_gci and remove_gci, and compare the
+    subsumers of every name after each change with reference_subsumers of generateOntology
+    on the current axioms. Half of the seeds collapse equivalent names, so both the
+    incremental update of the shared model and starting it over are covered.
+
+    :param seeds: Number of random ontologies
+    :param steps: Number of changes per ontology
+    :return: List of failure messages
+    """
+    failures = []
+    for seed in range(seeds):
+        generator = OntologyGenerator(12, 2, "random", 2, 2, 0.1, 0.3, seed)
+        pending = [gci for axiom in generator.generate() for gci in gcis(axiom)]
+        rng = random.Random(seed)
+        rng.shuffle(pending)
+        current, pending = pending[:len(pending) // 2], pending[len(pending) // 2:]
+        reasoner = Reasoner(compile_axioms(generator.names, generator.roles, current),
+                            collapse=seed % 2 == 0)
+        reasoner.classify()
+        reasoner.subsumers(generator.names[-1])
+
+        for step in range(steps):
+            if pending and (not current or rng.random() < 0.6):
+                gci = pending.pop()
+                reasoner.add_gci(gci[1], gci[2])
+                current.append(gci)
+            else:
+                gci = current.pop(rng.randrange(len(current)))
+                if not reasoner.remove_gci(gci[1], gci[2]):
+                    failures.append(f"seed {seed}, step {step}: {gci} was not removed")
+            for name in generator.names:
+                expected = set(reference_subsumers(generator.names, generator.roles, current, name))
+                if set(reasoner.subsumers(name)) != expected:
+                    failures.append(f"seed {seed}, step {step}: wrong subsumers of {name}")
+                    break
+    return failures
+
+def check_matrix_backend(seeds=24):
+    """
+    Compare the matrix backend with the worklist engine and with reference_subsumers of
+    generateOntology on random ontologies of every shape, for single queries and classify,
+    with modules and collapsing switched on and off.
+
+    :param seeds: Number of random ontologies
+    :return: List of failure messages
+    """
+    import numpy, scipy.sparse  # Optional dependencies of the matrix backend
+
+    shapes = ["chain", "fanout", "snomed", "random"]
+    failures = []
+    for seed in range(seeds):
+        generator = OntologyGenerator(15, 3, shapes[seed % len(shapes)], 3, 2, 0.1, 0.3, seed)
+        axioms = generator.generate()
+        compiled = compile_axioms(generator.names, generator.roles, axioms)
+        expected = {name: set(reference_subsumers(generator.names, generator.roles, axioms, name))
+                    for name in generator.names}
+        for use_modules in (False, True):
+            for collapse in (False, True):
+                settings = f"seed {seed}, modules {use_modules}, collapse {collapse}"
+                matrix = Reasoner(compiled, "matrix", use_modules, collapse)
+                worklist = Reasoner(compiled, "worklist", use_modules, collapse)
+                if matrix.classify() != worklist.classify():
+                    failures.append(f"{settings}: classify differs from the worklist engine")
+                for name in generator.names:
+                    if set(matrix.subsumers(name)) != expected[name]:
+                        failures.append(f"{settings}: wrong subsumers of {name}")
+                        break
+    return failures
+
+def gcis(axiom):
+    """
+    Split a generated axiom into ("sub", lhs, rhs) axioms.
+    """
+    if axiom[0] == "sub":
+        return [axiom]
+    concepts = axiom[1]
+    return [("sub", a, b) for a, b in zip(concepts, concepts[1:])] + \
+           [("sub", b, a) for a, b in zip(concepts, concepts[1:])]
+
+CHECKS = {
+    "loader-labels": check_loader_labels,
+    "dl-names": check_dl_names,
+    "incremental": check_incremental,
+    "matrix-backend": check_matrix_backend,
+}
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 #! /usr/bin/python3
 
-import sys,glob,subprocess, os.path
+import glob,subprocess, os.path
+import json, time, shlex, queue, select, argparse
+from concurrent.futures import ThreadPoolExecutor
 
 testDataPath = "TestData"
 
@@ -72,6 +74,228 @@ def testReasoner(reasonerPythonFile):
     outputfile.close()
 
 
-reasoner = sys.argv[1]
+def findTestCases(extraClasses):
+    """
+    Collect the (ontology file, class name, expected subsumers) test cases in the test data.
+    NAME-subsumers.txt holds the subsumers of class A in NAME.owl, and NAME-subsumers-CLASS.txt
+    those of CLASS. The classes listed in NAME-classes.txt, one per line, are queried in NAME.owl
+    without expected subsumers (expected is None), for timing only, and so are the extra classes.
 
-testReasoner(reasoner)
+    :param extraClasses: "ONTOLOGY.owl:CLASS" to query CLASS in one ontology, or "CLASS" to
+                         query it in every ontology
+    """
+    ontologyFiles = [ontologyFile for (ontologyFile, _) in testData]
+    extraByOntology = {ontologyFile: [] for ontologyFile in ontologyFiles}
+    for entry in extraClasses:
+        if ".owl:" in entry:
+            ontologyFile, className = entry.split(".owl:", 1)
+            extraByOntology[ontologyFile+".owl"].append(className)
+        else:
+            for ontologyFile in ontologyFiles:
+                extraByOntology[ontologyFile].append(entry)
+
+    cases = []
+    for (ontologyFile, subsumersFile) in testData:
+        name = ontologyFile[:-4]
+        expectedFiles = [("A", subsumersFile)]
+        prefix = name + "-subsumers-"
+        for file in sorted(glob.glob(prefix + "*.txt", root_dir=testDataPath)):
+            expectedFiles.append((file[len(prefix):-4], file))
+
+        classes = set()
+        for (className, file) in expectedFiles:
+            if not os.path.exists(testDataPath+"/"+file):
+                continue
+            with open(testDataPath+"/"+file) as expected:
+                cases.append((ontologyFile, className, set(line.strip() for line in expected) - {""}))
+            classes.add(className)
+        extra = list(extraByOntology[ontologyFile])
+        classesFile = testDataPath+"/"+name+"-classes.txt"
+        if os.path.exists(classesFile):
+            with open(classesFile) as listed:
+                extra = [line.strip() for line in listed if line.strip()] + extra
+        for className in extra:
+            if className not in classes:
+                cases.append((ontologyFile, className, None))
+                classes.add(className)
+    return cases
+
+class WarmReasoner:
+    def __init__(self, command):
+        """
+        A reasoner process started once with --serve, which then answers one
+        "ONTOLOGY_FILE CLASS_NAME" line after another with its subsumers and an empty line.
+        """
+        self.command = command + ["--serve"]
+        self.start()
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        self.buffer = b""
+
+    def query(self, ontologyPath, className, timeout):
+        """
+        Ask the process for the subsumers of a class. On a timeout or crash the process is
+        restarted for the next query.
+
+        :return: List of output lines
+        """
+        self.process.stdin.write((shlex.quote(ontologyPath)+" "+shlex.quote(className)+"\n").encode("utf-8"))
+        self.process.stdin.flush()
+
+        deadline = time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        while True:
+            # The answer ends with an empty line; an empty answer is only that line
+            if self.buffer.startswith(b"\n"):
+                answer, self.buffer = b"", self.buffer[1:]
+                break
+            end = self.buffer.find(b"\n\n")
+            if end >= 0:
+                answer, self.buffer = self.buffer[:end], self.buffer[end+2:]
+                break
+
+            remaining = deadline - time.monotonic()
+            ready, _, _ = select.select([fd], [], [], max(remaining, 0))
+            chunk = os.read(fd, 65536) if ready else None
+            if not chunk:
+                self.close()
+                self.start()
+                if chunk is None:
+                    raise subprocess.TimeoutExpired(self.command, timeout)
+                raise RuntimeError("reasoner process exited")
+            self.buffer += chunk
+        return answer.decode("utf-8").split("\n") if answer else []
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+def runTestCase(case, command, warmReasoners, timeout):
+    """
+    Run one test case, either in a fresh process or on a warm reasoner from the pool.
+    A case the reasoner rejects with "--Input Error" (e.g. a --class that is not in the
+    ontology), or whose process fails, is an error and not a timed answer.
+
+    :return: Result dictionary with the correctness and latency of the case
+    """
+    (ontologyFile, className, expected) = case
+    fullPath = os.path.abspath(testDataPath+"/"+ontologyFile)
+    result = {"ontology": ontologyFile, "class": className}
+
+    start = time.perf_counter()
+    try:
+        if warmReasoners is None:
+            completed = subprocess.run(command + [fullPath, className], capture_output=True, timeout=timeout)
+            outputLines = completed.stdout.decode("utf-8").split("\n")
+            inputError = any(line.startswith("--Input Error") for line in outputLines)
+            if completed.returncode != 0 and not inputError:
+                errorLines = completed.stderr.decode("utf-8").strip().split("\n")
+                raise RuntimeError(f"exit status {completed.returncode}: {errorLines[-1]}")
+        else:
+            warm = warmReasoners.get()
+            try:
+                outputLines = warm.query(fullPath, className, timeout)
+            finally:
+                warmReasoners.put(warm)
+    except (subprocess.TimeoutExpired, RuntimeError) as e:
+        result.update(latency=round(time.perf_counter() - start, 6),
+                      success=None if expected is None else False, error=str(e))
+        return result
+
+    result["latency"] = round(time.perf_counter() - start, 6)
+    outputLines = set(line.strip() for line in outputLines) - {""}
+    inputErrors = sorted(line for line in outputLines if line.startswith("--Input Error"))
+    if inputErrors:
+        result.update(success=None if expected is None else False, error=inputErrors[0])
+        return result
+    result["success"] = None if expected is None else outputLines == expected
+    if expected is not None and not result["success"]:
+        result["missing"] = sorted(expected - outputLines)
+        result["unexpected"] = sorted(outputLines - expected)
+    return result
+
+def evaluateReasoner(reasonerPythonFile, workers, warm, timeout, reasonerArgs, extraClasses, jsonFile):
+    """
+    Run all test cases concurrently on the given number of workers and report the
+    correctness and latency per case, and the throughput.
+    With warm, every worker keeps one reasoner process running with --serve for all its cases.
+    """
+    command = ["python", reasonerPythonFile] + reasonerArgs
+    cases = findTestCases(extraClasses)
+
+    warmReasoners = None
+    if warm:
+        warmReasoners = queue.Queue()
+        for _ in range(workers):
+            warmReasoners.put(WarmReasoner(command))
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(lambda case: runTestCase(case, command, warmReasoners, timeout), cases))
+    finally:
+        if warmReasoners is not None:
+            while not warmReasoners.empty():
+                warmReasoners.get().close()
+    wallTime = time.perf_counter() - start
+
+    # Throughput and latency only count the cases that were answered
+    latencies = sorted(result["latency"] for result in results if "error" not in result)
+    checked = [result for result in results if result["success"] is not None]
+    summary = {
+        "reasoner": reasonerPythonFile,
+        "workers": workers,
+        "warm": warm,
+        "cases": len(results),
+        "passed": sum(1 for result in checked if result["success"]),
+        "checked": len(checked),
+        "errors": sum(1 for result in results if "error" in result),
+        "wall_time": round(wallTime, 6),
+        "throughput": round(len(latencies) / wallTime, 3) if wallTime > 0 else None,
+        "mean_latency": round(sum(latencies) / len(latencies), 6) if latencies else None,
+        "p95_latency": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+    }
+
+    width = max([len(result["ontology"]) for result in results] + [8])
+    classWidth = max([len(result["class"]) for result in results] + [5])
+    print("ontology".ljust(width), "class".ljust(classWidth), "success".ljust(7), "latency_s")
+    for result in results:
+        success = "-" if result["success"] is None else str(result["success"])
+        print(result["ontology"].ljust(width), result["class"].ljust(classWidth), success.ljust(7),
+              f"{result['latency']:.4f}", result.get("error", ""))
+    print(f"passed {summary['passed']}/{summary['checked']}, {summary['cases']} cases "
+          f"({summary['errors']} errors) in {wallTime:.3f}s, "
+          f"{summary['throughput']} answered cases/s, mean latency {summary['mean_latency']}s, "
+          f"p95 latency {summary['p95_latency']}s")
+
+    if jsonFile is not None:
+        with open(jsonFile, "w") as file:
+            json.dump({"summary": summary, "results": results}, file, indent=1)
+    return summary
+
+argParser = argparse.ArgumentParser(
+    description="Check a reasoner against the expected subsumers in "+testDataPath+". "
+                "Without --workers, --warm, --class or --json the cases run one by one as before.")
+argParser.add_argument("reasoner", help="Python file of the reasoner")
+argParser.add_argument("--workers", type=int, help="number of test cases to run at the same time")
+argParser.add_argument("--warm", action="store_true",
+                       help="keep one reasoner process per worker running with --serve instead of one process per case")
+argParser.add_argument("--timeout", type=float, default=60, help="time limit per case in seconds (default: %(default)s)")
+argParser.add_argument("--reasoner-args", default="", help="extra arguments for the reasoner, e.g. --reasoner-args=--native")
+argParser.add_argument("--class", dest="classes", action="append", default=[], metavar="[ONTOLOGY.owl:]CLASS",
+                       help="also query CLASS in ONTOLOGY.owl, or in every ontology without ONTOLOGY.owl:, "
+                            "timed but not checked (repeatable); NAME-classes.txt in "+testDataPath+
+                            " lists such classes for NAME.owl")
+argParser.add_argument("--json", metavar="FILE", help="write the results and the summary as JSON to FILE")
+args = argParser.parse_args()
+for entry in args.classes:
+    if ".owl:" in entry and entry.split(".owl:", 1)[0]+".owl" not in [ontologyFile for (ontologyFile, _) in testData]:
+        argParser.error("no ontology "+entry.split(":")[0]+" in "+testDataPath)
+
+if args.workers is None and not args.warm and not args.classes and args.json is None:
+    testReasoner(args.reasoner)
+else:
+    evaluateReasoner(args.reasoner, args.workers or 1, args.warm, args.timeout,
+                     shlex.split(args.reasoner_args), args.classes, args.json)
@@ -0,0 +1,295 @@
+#! /usr/bin/python3
+
+import os
+import sys
+import random
+import argparse
+from collections import deque
+import xml.etree.ElementTree as ET
+
+evaluatorPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(evaluatorPath))
+
+from CompiledTBox import ConceptKind
+from OWLLoader import OWLLoader
+
+OWL_NAMESPACE = "http://www.w3.org/2002/07/owl#"
+ONTOLOGY_IRI = "http://example.org/generated"
+
+# The evaluator always queries the class A
+QUERY_CLASS = "A"
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Generate seeded synthetic EL ontologies with the subsumers of class A "
+                    "in the NAME-subsumers.txt format of evaluateReasonerStudents.py.")
+    arg_parser.add_argument("--names", type=int, nargs="+", default=[1000], metavar="N",
+                            help="number of concept names; several values write one ontology per size")
+    arg_parser.add_argument("--roles", type=int, default=5, help="number of roles (default: %(default)s)")
+    arg_parser.add_argument("--shape", choices=["chain", "fanout", "snomed", "random"], default="snomed",
+                            help="shape of the told hierarchy (default: %(default)s)")
+    arg_parser.add_argument("--conjunction-width", type=int, default=3, metavar="W",
+                            help="maximum number of conjuncts in a definition (default: %(default)s)")
+    arg_parser.add_argument("--existential-depth", type=int, default=2, metavar="D",
+                            help="maximum nesting depth of existential restrictions (default: %(default)s)")
+    arg_parser.add_argument("--cycles", type=float, default=0.05, metavar="P",
+                            help="probability that a name gets a cyclic ∃-definition (default: %(default)s)")
+    arg_parser.add_argument("--equivalences", type=float, default=0.2, metavar="P",
+                            help="probability that a name is defined by an equivalence (default: %(default)s)")
+    arg_parser.add_argument("--seed", type=int, default=60)
+    arg_parser.add_argument("--format", choices=["owl", "eltbox"], default="owl",
+                            help="write OWL/XML, or a compiled TBox as stored by CompiledTBox.save")
+    arg_parser.add_argument("--no-subsumers", action="store_true",
+                            help="do not compute the expected subsumers file")
+    arg_parser.add_argument("--output-dir", default=".", help="directory to write to (default: %(default)s)")
+    arg_parser.add_argument("--prefix", default="generated",
+                            help="file names are PREFIX-SHAPE-N.owl and PREFIX-SHAPE-N-subsumers.txt")
+    args = arg_parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for size in args.names:
+        generator = OntologyGenerator(size, args.roles, args.shape, args.conjunction_width,
+                                      args.existential_depth, args.cycles, args.equivalences, args.seed)
+        axioms = generator.generate()
+
+        base = os.path.join(args.output_dir, f"{args.prefix}-{args.shape}-{size}")
+        if args.format == "owl":
+            with open(base + ".owl", "wb") as file:
+                write_owl_xml(generator.names, generator.roles, axioms, file)
+        else:
+            with open(base + ".eltbox", "wb") as file:
+                compile_axioms(generator.names, generator.roles, axioms).save(file)
+
+        if not args.no_subsumers:
+            with open(base + "-subsumers.txt", "w") as file:
+                for name in reference_subsumers(generator.names, generator.roles, axioms, QUERY_CLASS):
+                    print(name, file=file)
+        print(f"{base}: {len(generator.names)} names, {len(axioms)} axioms")
+
+class OntologyGenerator:
+    def __init__(self, name_count, role_count, shape, conjunction_width, existential_depth,
+                 cycles, equivalences, seed):
+        """
+        Initialize a generator of random EL ontologies. The same arguments always give the same ontology.
+
+        The told hierarchy between the names is a deep chain, a wide fan-out below one root,
+        a SNOMED-like polyhierarchy (one to three parents, mostly close above) or random
+        single parents with extra GCIs that have a conjunction or existential as left-hand side.
+        On top of that, names are defined by an equivalence with the conjunction of their parents
+        and existentials, and some names get a ∃-restriction to one of their descendants.
+
+        Axioms are class expressions in the tuple format of OWLLoader.
+
+        :param name_count: Number of concept names, including the query class A
+        :param role_count: Number of roles
+        :param shape: "chain", "fanout", "snomed" or "random"
+        :param conjunction_width: Maximum number of conjuncts in a definition
+        :param existential_depth: Maximum nesting depth of existential restrictions
+        :param cycles: Probability that a name gets a cyclic ∃-definition
+        :param equivalences: Probability that a name is defined by an equivalence
+        :param seed: Random seed
+        """
+        self.shape = shape
+        self.conjunction_width = max(1, conjunction_width)
+        self.existential_depth = max(1, existential_depth)
+        self.cycles = cycles
+        self.equivalences = equivalences
+        self.random = random.Random(seed)
+
+        # Hierarchy order: every name only has parents before it; A is the last, most specific one
+        self.names = [f"C{index}" for index in range(1, max(1, name_count))] + [QUERY_CLASS]
+        self.roles = [f"r{index}" for index in range(max(1, role_count))]
+
+    def generate(self):
+        """
+        Generate the axioms.
+
+        :return: List of ("sub", lhs, rhs) and ("equiv", [concepts]) tuples
+        """
+        axioms = []
+        for index in range(1, len(self.names)):
+            name = ("name", self.names[index])
+            parents = [("name", self.names[parent]) for parent in self.parents(index)]
+
+            if self.random.random() < self.equivalences:
+                conjuncts = list(parents)
+                while len(conjuncts) < self.conjunction_width and self.random.random() < 0.7:
+                    conjuncts.append(self.existential(self.existential_depth))
+                definition = conjuncts[0] if len(conjuncts) == 1 else ("and", conjuncts)
+                axioms.append(("equiv", [name, definition]))
+            else:
+                for parent in parents:
+                    axioms.append(("sub", name, parent))
+                if self.random.random() < 0.5:
+                    axioms.append(("sub", name, self.existential(self.existential_depth)))
+
+            if self.random.random() < self.cycles:
+                # An ancestor-or-other name that needs an r-successor of this name
+                other = ("name", self.names[self.random.randrange(index)])
+                axioms.append(("sub", other, ("some", self.random.choice(self.roles), name)))
+
+        if self.shape == "random":
+            for _ in range(len(self.names) // 4):
+                if self.random.random() < 0.5:
+                    lhs = ("and", [self.random_name(), self.random_name()])
+                else:
+                    lhs = ("some", self.random.choice(self.roles), self.random_name())
+                axioms.append(("sub", lhs, self.random_name()))
+        return axioms
+
+    def parents(self, index):
+        """
+        Return the indices of the told parents of a name, all smaller than index.
+        """
+        if self.shape == "chain":
+            return [index - 1]
+        if self.shape == "fanout":
+            return [0]
+        if self.shape == "snomed":
+            count = min(index, self.random.choice([1, 1, 1, 2, 2, 3]))
+            # Mostly close to the name, so the hierarchy gets deep
+            return sorted({index - 1 - int((index - 1) * self.random.random() ** 4) for _ in range(count)})
+        return [self.random.randrange(index)]
+
+    def existential(self, depth):
+        """
+        Return a random ∃r.F where F is a name, or with depth left a conjunction or another existential.
+        """
+        role = self.random.choice(self.roles)
+        if depth <= 1 or self.random.random() < 0.5:
+            return ("some", role, self.random_name())
+        if self.random.random() < 0.5:
+            return ("some", role, self.existential(depth - 1))
+        return ("some", role, ("and", [self.random_name(), self.existential(depth - 1)]))
+
+    def random_name(self):
+        return ("name", self.random.choice(self.names))
+
+def compile_axioms(names, roles, axioms):
+    """
+    Compile generated axioms with the interning of OWLLoader.
+
+    :return: CompiledTBox
+    """
+    loader = OWLLoader()
+    for name in names:
+        loader.compiled.intern_name(name)
+    for role in roles:
+        loader.compiled.intern_role(role)
+    for axiom in axioms:
+        if axiom[0] == "sub":
+            loader.add_subsumption(axiom[1], axiom[2])
+        else:
+            loader.add_equivalence(axiom[1])
+    return loader.compiled
+
+def reference_subsumers(names, roles, axioms, query_class):
+    """
+    Compute the subsumers of a class with a small stand-alone implementation of the
+    completion rules that shares no code with Saturation or MatrixSaturation, so it can check them.
+    There is one element per queried class and existential filler, and the facts
+    (element, concept) are processed from a queue.
+
+    :return: Names of the subsuming concept names, in the order of names
+    """
+    compiled = compile_axioms(names, roles, axioms)
+    concepts = compiled.concepts
+    existential_ids = {}
+    existentials_by_filler = {}
+    conjunctions_by_child = {}
+    for concept in concepts:
+        if concept.kind == ConceptKind.EXISTENTIAL:
+            existential_ids[(concept.role, concept.children[0])] = concept.id
+            existentials_by_filler.setdefault(concept.children[0], []).append(concept)
+        elif concept.kind == ConceptKind.CONJUNCTION:
+            for child in concept.children:
+                conjunctions_by_child.setdefault(child, []).append(concept)
+
+    start = compiled.name_id(query_class)
+    elements = {role_filler[1] for role_filler in existential_ids} | {start}
+    model = {element: set() for element in elements}
+    predecessors = {element: {} for element in elements}  # element -> {role: {predecessors}}
+    queue = deque()
+
+    def add(element, concept):
+        if concept not in model[element]:
+            model[element].add(concept)
+            queue.append((element, concept))
+
+    for element in elements:
+        add(element, element)
+        add(element, compiled.top)
+
+    while queue:
+        element, concept = queue.popleft()
+        record = concepts[concept]
+        for subsumer in compiled.told_subsumers.get(concept, ()):
+            add(element, subsumer)
+        if record.kind == ConceptKind.CONJUNCTION:
+            for child in record.children:
+                add(element, child)
+        for conjunction in conjunctions_by_child.get(concept, ()):
+            if all(child in model[element] for child in conjunction.children):
+                add(element, conjunction.id)
+        if record.kind == ConceptKind.EXISTENTIAL:
+            # ∃r.F has the element of F as r-successor
+            successor = record.children[0]
+            role_predecessors = predecessors[successor].setdefault(record.role, set())
+            if element not in role_predecessors:
+                role_predecessors.add(element)
+                for successor_concept in list(model[successor]):
+                    if (record.role, successor_concept) in existential_ids:
+                        add(element, existential_ids[(record.role, successor_concept)])
+        for existential in existentials_by_filler.get(concept, ()):
+            for predecessor in list(predecessors[element].get(existential.role, ())):
+                add(predecessor, existential.id)
+
+    return [concepts[name].label for name in compiled.names if name in model[start]]
+
+def write_owl_xml(names, roles, axioms, file):
+    """
+    Write the ontology in OWL/XML with full IRIs, one axiom at a time.
+    """
+    def iri(name):
+        return f"{ONTOLOGY_IRI}#{name}"
+
+    def element(expression):
+        kind = expression[0]
+        if kind == "name":
+            return ET.Element("Class", IRI=iri(expression[1]))
+        if kind == "top":
+            return ET.Element("Class", abbreviatedIRI="owl:Thing")
+        if kind == "and":
+            node = ET.Element("ObjectIntersectionOf")
+            node.extend(element(conjunct) for conjunct in expression[1])
+            return node
+        node = ET.Element("ObjectSomeValuesFrom")
+        node.append(ET.Element("ObjectProperty", IRI=iri(expression[1])))
+        node.append(element(expression[2]))
+        return node
+
+    def write(node):
+        file.write(b" " + ET.tostring(node, encoding="utf-8", xml_declaration=False) + b"\n")
+
+    file.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+    file.write(f'<Ontology xmlns="{OWL_NAMESPACE}" ontologyIRI="{ONTOLOGY_IRI}">\n'.encode("utf-8"))
+    for name in names:
+        declaration = ET.Element("Declaration")
+        declaration.append(ET.Element("Class", IRI=iri(name)))
+        write(declaration)
+    for role in roles:
+        declaration = ET.Element("Declaration")
+        declaration.append(ET.Element("ObjectProperty", IRI=iri(role)))
+        write(declaration)
+    for axiom in axioms:
+        if axiom[0] == "sub":
+            node = ET.Element("SubClassOf")
+            node.extend([element(axiom[1]), element(axiom[2])])
+        else:
+            node = ET.Element("EquivalentClasses")
+            node.extend(element(concept) for concept in axiom[1])
+        write(node)
+    file.write(b"</Ontology>\n")
+
+if __name__ == "__main__":
+    main()